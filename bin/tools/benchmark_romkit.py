@@ -0,0 +1,295 @@
+#!/usr/bin/python3
+
+# Measures the performance characteristics of romkit for a system.  Each
+# benchmark only measures the code it's run against, so comparisons are made by
+# running the same benchmark against two different revisions.
+#
+# Available benchmarks:
+# * regex: Number of regular expression calls made while loading / listing the system
+# * memory: RSS growth, memory retained and ROM table size across (re)loading the system
+# * trace: Time spent loading the system and the cost of hot-path diagnostics when debug logging is off
+# * metadata: Time spent looking up metadata for each of the system's machines
+# * dat: Time spent parsing DATs with different numbers of workers
+# * generate-dat: Generates a synthetic DAT that other benchmarks can use (--dat)
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import gc
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / 'lib'))
+
+from romkit.models.machine import Machine
+from romkit.output.set_encoder import SetEncoder
+from romkit.systems import BaseSystem
+
+# Builds the system defined in the given settings file.  If a DAT is provided,
+# it replaces the DAT for the first romset (or the given romset).
+def build_system(settings_file: str, dat: Optional[str] = None, romset: Optional[str] = None) -> BaseSystem:
+    with open(settings_file) as file:
+        config = json.loads(os.path.expandvars(file.read()))
+
+    if dat:
+        romset_name = romset or next(iter(config['romsets']))
+        config['romsets'][romset_name]['resources']['dat'] = {'source': f'file://{Path(dat).resolve()}'}
+        config['romsets'][romset_name]['dat_cache'] = False
+
+    return BaseSystem.from_json(config)
+
+# Runs the given function a number of times, returning the timings (in seconds)
+def time_runs(fn: Callable, runs: int) -> List[float]:
+    timings = []
+    for run in range(runs):
+        start_time = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start_time)
+
+    return timings
+
+# Summarizes the given timings (in seconds)
+def format_timings(timings: List[float]) -> str:
+    return f'min={min(timings) * 1000:.1f}ms median={statistics.median(timings) * 1000:.1f}ms max={max(timings) * 1000:.1f}ms'
+
+# Counts the calls made to methods on compiled regular expressions in the given
+# profile, by method name
+def count_regex_calls(profile: cProfile.Profile) -> Dict[str, int]:
+    counts = {}
+    for (filename, line, function), (primitive_calls, total_calls, *_) in pstats.Stats(profile).stats.items():
+        if "of 're.Pattern' objects" in function:
+            method = function.split("'")[1]
+            counts[method] = counts.get(method, 0) + total_calls
+
+    return counts
+
+# Counts the calls made to compiled regular expressions while loading the system
+# (BaseSystem.load) and then listing it (as `romkit list` does)
+def benchmark_regex(args: argparse.Namespace) -> None:
+    system = build_system(args.settings_file, args.dat, args.romset)
+
+    load_profile = cProfile.Profile()
+    load_profile.enable()
+    system.load()
+    load_profile.disable()
+
+    list_profile = cProfile.Profile()
+    list_profile.enable()
+    for machine in system.list():
+        json.dumps(machine.dump(), cls=SetEncoder)
+    list_profile.disable()
+
+    for label, profile in [('load', load_profile), ('list', list_profile)]:
+        counts = count_regex_calls(profile)
+        print(f'{label}: {sum(counts.values())} regex calls ({", ".join(f"{method}={count}" for method, count in sorted(counts.items()))})')
+
+# Current resident set size (in MiB)
+def rss() -> float:
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+    return 0.0
+
+# Reports how much the RSS grows and how many rows are held in each romset's ROM
+# table after each (re)load of the system.  Optionally reports how much memory is
+# retained by Python allocations (which inflates the RSS).
+def benchmark_memory(args: argparse.Namespace) -> None:
+    system = build_system(args.settings_file, args.dat, args.romset)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    gc.collect()
+    start_rss = rss()
+
+    for load in range(args.loads):
+        system.load(force=True)
+        gc.collect()
+
+        summary = f'load {load + 1}: {len(system.prioritized_machines)} machines, RSS +{rss() - start_rss:.1f} MiB'
+        if all(hasattr(romset, 'rom_table') for romset in system.romsets):
+            rom_rows = ', '.join(f'{romset.name}={len(romset.rom_table)}' for romset in system.romsets)
+            summary += f', rom table rows: {rom_rows}'
+
+        if args.tracemalloc:
+            current, peak = tracemalloc.get_traced_memory()
+            summary += f', tracemalloc: {current / 2**20:.1f} MiB retained / {peak / 2**20:.1f} MiB peak'
+
+        print(summary)
+
+# Counts the per-machine diagnostics (e.g. "[name] Skip (rule)") that get logged
+class DiagnosticCounter(logging.Handler):
+    DIAGNOSTIC_REGEX = re.compile(r'^\[.*\] (Skip|Ignored) \(')
+
+    def __init__(self) -> None:
+        super().__init__(logging.DEBUG)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.DIAGNOSTIC_REGEX.match(record.getMessage()):
+            self.count += 1
+
+# Times how long it takes to load the system (BaseSystem.load) with debug
+# logging off and estimates how much of that is spent on per-machine
+# diagnostics, based on:
+# * The number of diagnostics generated during a load (counted at DEBUG level)
+# * The cost of each diagnostic when debug logging is off
+def benchmark_trace(args: argparse.Namespace) -> None:
+    system = build_system(args.settings_file, args.dat, args.romset)
+    root_logger = logging.getLogger()
+
+    # Count diagnostics
+    counter = DiagnosticCounter()
+    root_logger.addHandler(counter)
+    root_logger.setLevel(logging.DEBUG)
+    system.load(force=True)
+    root_logger.removeHandler(counter)
+    root_logger.setLevel(logging.INFO)
+
+    # Time loads with debug logging off
+    timings = time_runs(lambda: system.load(force=True), args.runs)
+    print(f'load: {format_timings(timings)}')
+
+    # Cost of each diagnostic with debug logging off
+    machine_name = 'game'
+    rule_id = 'rule'
+    logging_ns = timeit.timeit(lambda: logging.debug(f'[{machine_name}] Skip ({rule_id})'), number=args.events) / args.events * 1e9
+    print(f'diagnostics: {counter.count} per load')
+    print(f'per diagnostic: f-string + logging.debug={logging_ns:.0f}ns', end='')
+
+    try:
+        from romkit.util.trace import tracer
+    except ImportError:
+        print()
+        print(f'estimated load time spent on diagnostics: {counter.count * logging_ns / 1e6:.1f}ms')
+        return
+
+    tracer.configure()
+    def trace() -> None:
+        if tracer.enabled:
+            tracer.machine(machine_name, 'Skip', rule_id)
+    tracer_ns = timeit.timeit(trace, number=args.events) / args.events * 1e9
+    print(f', tracer={tracer_ns:.0f}ns')
+    print(f'estimated load time spent on diagnostics: {counter.count * tracer_ns / 1e6:.1f}ms (saves {counter.count * (logging_ns - tracer_ns) / 1e6:.1f}ms vs logging.debug)')
+
+# Times how long it takes to look up metadata for every machine loaded by the
+# system.  Lookups are timed both cold (normalized names need to be computed)
+# and warm (normalized names are memoized from a previous run).
+def benchmark_metadata(args: argparse.Namespace) -> None:
+    system = build_system(args.settings_file, args.dat, args.romset)
+    system.load()
+    machines = system.machines.all()
+
+    found = sum(1 for machine in machines if system.metadata.get(machine))
+    print(f'lookups: {found} found / {len(machines)} lookups')
+
+    def lookup(clear: bool) -> None:
+        if clear and hasattr(Machine, '_normalize'):
+            Machine._normalize.cache_clear()
+
+        for machine in machines:
+            system.metadata.get(machine)
+
+    for label, clear in [('cold', True), ('warm', False)]:
+        timings = time_runs(lambda: lookup(clear), args.runs)
+        print(f'{label}: {format_timings(timings)}')
+
+# Times how long it takes to parse each romset's DAT (bypassing the DAT cache)
+# with different numbers of workers, verifying that the parsed machines are the
+# same regardless of the number of workers
+def benchmark_dat(args: argparse.Namespace) -> None:
+    system = build_system(args.settings_file, args.dat, args.romset)
+
+    for romset in system.romsets:
+        if args.romset and romset.name != args.romset:
+            continue
+
+        romset.load()
+        romset.dat_cache = False
+
+        baseline = None
+        for workers in args.workers:
+            romset.dat_workers = workers
+            timings = time_runs(lambda: list(romset.iter_machine_attrs()), args.runs)
+
+            machine_attrs = list(romset.iter_machine_attrs())
+            if baseline is None:
+                baseline = machine_attrs
+
+            print(f'{romset.name} dat_workers={workers}: {len(machine_attrs)} machines, {format_timings(timings)}, identical={machine_attrs == baseline}')
+
+# Generates a synthetic MAME-style DAT with parents / clones (which share ROM
+# names) and random sizes / CRCs
+def generate_dat(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+
+    with open(args.path, 'w') as file:
+        file.write('<?xml version="1.0"?>\n<mame build="synthetic">\n')
+        for index in range(args.machines):
+            parent_name = f'game{index // 4}'
+            clone_attrs = f' cloneof="{parent_name}" romof="{parent_name}"' if index % 4 else ''
+            file.write(f'\t<machine name="game{index}" sourcefile="src{index % 500}.c"{clone_attrs}>\n')
+            file.write(f'\t\t<description>Game {index} (USA)</description>\n')
+            file.write(f'\t\t<year>{1980 + index % 20}</year>\n')
+            file.write(f'\t\t<manufacturer>Maker {index % 300}</manufacturer>\n')
+            for rom_index in range(args.roms):
+                file.write(f'\t\t<rom name="{parent_name}.{rom_index}" size="{rng.randint(1, 1 << 20)}" crc="{rng.getrandbits(32):08x}"/>\n')
+            file.write('\t</machine>\n')
+        file.write('</mame>\n')
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    benchmarks = {
+        'regex': benchmark_regex,
+        'memory': benchmark_memory,
+        'dat': benchmark_dat,
+        'trace': benchmark_trace,
+        'metadata': benchmark_metadata,
+    }
+    for name, fn in benchmarks.items():
+        subparser = subparsers.add_parser(name)
+        subparser.add_argument(dest='settings_file', help='System settings file')
+        subparser.add_argument('--dat', help='DAT to use in place of the romset\'s DAT (e.g. from generate-dat)')
+        subparser.add_argument('--romset', help='Romset to benchmark / replace the DAT for')
+        subparser.set_defaults(fn=fn)
+
+    subparsers.choices['memory'].add_argument('--loads', type=int, default=3, help='Number of times to (re)load the system')
+    subparsers.choices['memory'].add_argument('--tracemalloc', action='store_true', help='Also report memory retained by Python allocations')
+
+    subparsers.choices['dat'].add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Numbers of DAT workers to compare')
+    subparsers.choices['dat'].add_argument('--runs', type=int, default=3, help='Number of timed runs')
+
+    subparsers.choices['trace'].add_argument('--runs', type=int, default=5, help='Number of timed loads')
+    subparsers.choices['trace'].add_argument('--events', type=int, default=1000000, help='Number of diagnostics to time for the per-diagnostic cost')
+
+    subparsers.choices['metadata'].add_argument('--runs', type=int, default=5, help='Number of timed runs')
+
+    subparser = subparsers.add_parser('generate-dat')
+    subparser.add_argument(dest='path', help='Path to write the DAT to')
+    subparser.add_argument('--machines', type=int, default=50000, help='Number of machines')
+    subparser.add_argument('--roms', type=int, default=12, help='Number of ROMs per machine')
+    subparser.add_argument('--seed', type=int, default=1, help='Random seed for sizes / CRCs')
+    subparser.set_defaults(fn=generate_dat)
+
+    args = parser.parse_args()
+    args.fn(args)
+
+
+if __name__ == '__main__':
+    main()
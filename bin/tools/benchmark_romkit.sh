@@ -0,0 +1,25 @@
+#!/bin/bash
+
+dir="$(cd "$(dirname "${BASH_SOURCE[0]}")" &> /dev/null && pwd)"
+. "$dir/../common.sh"
+
+usage() {
+  echo "usage:"
+  echo " $0 <benchmark> <system> [options]"
+  exit 1
+}
+
+# Runs one of the benchmarks in benchmark_romkit.py against a system's settings
+benchmark() {
+  local name=$1
+  local system=$2
+  local system_settings_file=$(generate_system_settings_file "$system")
+
+  TMPDIR="$tmp_dir" python3 "$dir/benchmark_romkit.py" "$name" "$system_settings_file" "${@:3}"
+}
+
+if [[ $# -lt 2 ]]; then
+  usage
+fi
+
+benchmark "$@"
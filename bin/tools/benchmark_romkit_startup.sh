@@ -0,0 +1,44 @@
+#!/bin/bash
+
+dir="$(cd "$(dirname "${BASH_SOURCE[0]}")" &> /dev/null && pwd)"
+. "$dir/../common.sh"
+
+usage() {
+  echo "usage:"
+  echo " $0 <system> [runs]"
+  exit 1
+}
+
+# Measures how long it takes to run `romkit list` for a system whose DAT /
+# metadata caches have already been built.  The same settings file is reused
+# across runs so that caches keyed by the metadata path remain valid.
+benchmark() {
+  local system=$1
+  local runs=${2:-10}
+  local system_settings_file=$(generate_system_settings_file "$system")
+
+  # Warm up caches
+  TMPDIR="$tmp_dir" python3 "$lib_dir/romkit/cli.py" list "$system_settings_file" >/dev/null
+
+  # Time each run (in milliseconds)
+  local timings=()
+  for run in $(seq "$runs"); do
+    local start=$(date +%s%N)
+    TMPDIR="$tmp_dir" python3 "$lib_dir/romkit/cli.py" list "$system_settings_file" >/dev/null
+    local end=$(date +%s%N)
+    timings+=($(( (end - start) / 1000000 )))
+  done
+
+  local sorted_timings=($(printf '%s\n' "${timings[@]}" | sort -n))
+  echo "romkit list $system ($runs runs): min=${sorted_timings[0]}ms median=${sorted_timings[$(( runs / 2 ))]}ms max=${sorted_timings[-1]}ms"
+
+  # Report the time spent importing romkit (in microseconds)
+  local import_time=$(python3 -X importtime -c "import sys; sys.path.insert(0, '$lib_dir'); import romkit.systems" 2>&1 | grep -E '\| romkit.systems$' | cut -d'|' -f2 | tr -d ' ')
+  echo "import romkit.systems: $(( import_time / 1000 ))ms"
+}
+
+if [[ $# -lt 1 ]]; then
+  usage
+fi
+
+benchmark "$@"
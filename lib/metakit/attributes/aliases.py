@@ -5,6 +5,7 @@ from metakit.attributes.base import BaseAttribute
 class AliasesAttribute(BaseAttribute):
     name = 'aliases'
     set_from_machine = True
+    cleans_metadata = True
 
     def validate(self, value: List[str], validation: ValidationResults) -> None:
         if not all(alias and isinstance(alias, str) for alias in value):
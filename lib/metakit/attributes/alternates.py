@@ -7,6 +7,7 @@ from metakit.attributes.base import BaseAttribute
 
 class AlternatesAttribute(BaseAttribute):
     name = 'alternates'
+    cleans_metadata = True
 
     def load(self) -> None:
         self._discovery_loaded = False
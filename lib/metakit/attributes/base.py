@@ -7,6 +7,10 @@ class BaseAttribute:
     supports_overrides = True
     set_from_machine = False
 
+    # Whether this attribute removes anything from the metadata when cleaned (see
+    # `clean_metadata`)
+    cleans_metadata = False
+
     def __init__(self, romkit: ROMKit, config: dict) -> None:
         self.romkit = romkit
         self.config = config
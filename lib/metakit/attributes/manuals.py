@@ -7,6 +7,7 @@ from collections import defaultdict
 
 class ManualsAttribute(BaseAttribute):
     name = 'manuals'
+    cleans_metadata = True
 
     KEYS = ['name', 'languages', 'url', 'options']
     OPTIONS_KEYS = ['filter', 'format', 'pages', 'rotate', 'rewrite_exif']
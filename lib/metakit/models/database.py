@@ -10,6 +10,7 @@ from metakit.attributes import __all_attributes__, BaseAttribute
 from metakit.models.romkit import ROMKit
 from metakit.models.validation_results import ValidationResults
 from romkit.models.machine import Machine
+from romkit.processing.metadata_store import MetadataOverlay, MetadataStore
 
 # Represents a metadata database for a system
 class Database:
@@ -22,9 +23,12 @@ class Database:
         self.reload()
 
     # Loads the dataset into memory.  If previously opened, the dataset will be overwritten.
+    # 
+    # The dataset is an overlay on top of the snapshot shared with romkit so that
+    # the database is only parsed / held in memory once.  Changes are tracked in the
+    # overlay until saved.
     def reload(self) -> None:
-        with self.path.open() as f:
-            self.dataset = json.load(f)
+        self.dataset = MetadataOverlay(MetadataStore.open(self.path))
 
     # Look up the given attribute by name
     def attribute(self, name: str) -> BaseAttribute:
@@ -40,7 +44,7 @@ class Database:
     @property
     def groups(self) -> Set[str]:
         groups = set()
-        for key, metadata in self.dataset.items():
+        for key, metadata in self.dataset.peek_items():
             if 'group' not in metadata:
                 groups.add(key)
         return groups
@@ -55,6 +59,14 @@ class Database:
             if key in self.dataset:
                 return self.dataset[key]
 
+    # Gets the first dataset entry that matches one of the given keys without
+    # copying it out of the shared snapshot.  The result must not be modified.
+    def peek(self, *keys) -> Optional[dict]:
+        for key in keys:
+            metadata = self.dataset.peek(key)
+            if metadata is not None:
+                return metadata
+
     # Overrides the given key with new metadata
     def set(self, key: str, metadata: dict) -> None:
         self.dataset[key] = metadata
@@ -106,10 +118,10 @@ class Database:
             attribute.migrate_metadata(from_key, to_key, source_metadata)
 
         # Migrate overrides tied to the group being migrated
-        for other_key, other_metadata in self.dataset.items():
-            if other_metadata.get('group') == from_key:
-                logging.info(f'[{to_key}] [group] Updated {other_key}')
-                other_metadata['group'] = to_key
+        other_keys = [other_key for other_key, other_metadata in self.dataset.peek_items() if other_metadata.get('group') == from_key]
+        for other_key in other_keys:
+            logging.info(f'[{to_key}] [group] Updated {other_key}')
+            self.dataset[other_key]['group'] = to_key
 
         self.update(to_key, source_metadata)
 
@@ -126,10 +138,9 @@ class Database:
                 attribute.set(metadata, machine, self.romkit.find_machines_by_group(group))
 
             if attribute.name == 'id':
-                for key, metadata in self.dataset.items():
-                    if 'group' not in metadata:
-                        continue
-
+                grouped_keys = [key for key, metadata in self.dataset.peek_items() if 'group' in metadata]
+                for key in grouped_keys:
+                    metadata = self.dataset[key]
                     group = metadata['group']
                     attribute.set(metadata, machine, self.romkit.find_machines_by_group(group))
 
@@ -137,8 +148,13 @@ class Database:
     # 
     # This is typically run after a merge.
     def clean(self) -> None:
-        for key, metadata in self.dataset.items():
-            for attribute in self.attributes:
+        # Only entries with a value for an attribute that does any cleaning can change
+        attributes = [attribute for attribute in self.attributes if attribute.cleans_metadata]
+        keys = [key for key, metadata in self.dataset.peek_items() if any(attribute.name in metadata for attribute in attributes)]
+
+        for key in keys:
+            metadata = self.dataset[key]
+            for attribute in attributes:
                 attribute.clean_metadata(key, metadata)
 
     # Validates that this database is properly implemented by checking all values
@@ -149,7 +165,7 @@ class Database:
         validation_results = ValidationResults()
 
         # Check metadata values
-        for key, metadata in self.dataset.items():
+        for key, metadata in self.dataset.peek_items():
             validation_results.scope = key
             for attribute in self.attributes:
                 attribute.validate_metadata(key, metadata, validation_results)
@@ -171,7 +187,7 @@ class Database:
 
         mappings = {}
 
-        for key, metadata in self.dataset.items():
+        for key, metadata in self.dataset.peek_items():
             mappings[key] = key
             mappings[Machine.normalize(key)] = key
 
@@ -197,7 +213,7 @@ class Database:
         for group in sorted(target_groups):
             # Short circuit if group hasn't changed
             if self.exists(group):
-                original_key = self.get(group).get('group', group)
+                original_key = self.peek(group).get('group', group)
                 if original_key != group:
                     migration_plan[original_key] = group
 
@@ -214,7 +230,7 @@ class Database:
             lookup_values = [machine.id for machine in machines] + [Machine.normalize(group)]
             for value in lookup_values:
                 key = lookup_table.get(value)
-                metadata = self.get(key)
+                metadata = self.peek(key)
 
                 if metadata is None or 'group' in metadata:
                     # There's a group override or we're not tracking this key.
@@ -236,7 +252,7 @@ class Database:
                 migration_plan[group] = group
 
         # Mark invalid keys as not having a corresponding target
-        for key, metadata in self.dataset.items():
+        for key, metadata in self.dataset.peek_items():
             group = metadata.get('group', key)
             if group not in target_groups and migration_plan.get(group) == None:
                 migration_plan[key] = None
@@ -256,7 +272,7 @@ class Database:
 
         # Add metadata sorted by key
         for key in sorted(self.keys):
-            metadata = self.dataset[key]
+            metadata = self.dataset.peek(key)
             metadata_attrs = sorted(metadata.keys())
 
             new_metadata = serialized_data[key] = {}
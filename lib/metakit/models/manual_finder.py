@@ -37,7 +37,7 @@ class ManualFinder:
         # a slightly different name) should exist in the database
         self.title_to_groups = defaultdict(set)
         for group in self.database.groups:
-            metadata = self.database.get(group)
+            metadata = self.database.peek(group)
             self.title_to_groups[group].add(group)
 
             if 'merge' in metadata:
@@ -397,7 +397,7 @@ class ManualFinder:
             if not group:
                 break
 
-            metadata = self.database.get(group)
+            metadata = self.database.peek(group)
             if not metadata:
                 print('Group not found!')
                 continue
@@ -407,7 +407,7 @@ class ManualFinder:
     # Reviews current database's groups by attempting to search for a keyword used in the url
     def _review_group_by_url_search(self, matches: List[dict], group: str) -> None:
         self.database.reload()
-        metadata = self.database.get(group)
+        metadata = self.database.peek(group)
         if not metadata:
             # Group has since been removed
             return
@@ -542,7 +542,7 @@ class ManualFinder:
             choices = []
             for group in sorted(groups):
                 description = group
-                aliases = self.database.get(group).get('aliases', []) + self.database.get(group).get('merge', [])
+                aliases = self.database.peek(group).get('aliases', []) + self.database.peek(group).get('merge', [])
                 if aliases:
                     description = f"{description} ({', '.join(aliases)})"
                 choices.append(questionary.Choice(description, value=group))
@@ -567,7 +567,7 @@ class ManualFinder:
 
     # Prints the existing manuals for the given group
     def _print_existing_manuals(self, group: str) -> None:
-        metadata = self.database.get(group)
+        metadata = self.database.peek(group)
 
         # Print existing manuals
         manuals = metadata.get('manuals', [])
@@ -8,6 +8,12 @@ from romkit.systems import BaseSystem
 # Provides an interface to ROMKit data
 class ROMKit:
     def __init__(self, config: dict) -> None:
+        # Resolve metadata lazily from the database snapshot that's shared with
+        # metakit (rather than from romkit's own cache) so that the database is
+        # only held in memory once
+        if 'metadata' in config:
+            config = {**config, 'metadata': {**config['metadata'], 'cache': False, 'lazy': True}}
+
         self.system = BaseSystem.from_json(config)
 
         self.names = set()
@@ -51,7 +51,7 @@ class BaseSystem:
         self.romkit.load()
         for group in self.romkit.resolved_groups:
             for machine in self.romkit.find_machines_by_group(group):
-                name_candidates = set(machine.alt_names + [machine.name])
+                name_candidates = {*machine.alt_names, machine.name}
                 if not name_candidates.intersection(attribute.valid_discovered_names):
                     print(f'[{machine.name}] Failed to discover')
 
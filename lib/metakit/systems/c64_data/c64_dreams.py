@@ -86,7 +86,7 @@ class C64Dreams:
             mappings[self.normalize_title(group)] = group
 
             # Add merge titles for potentially more identifiers to match
-            for merge_name in self.metakit_database.get(group).get('merge', []):
+            for merge_name in self.metakit_database.peek(group).get('merge', []):
                 mappings[merge_name] = group
 
                 normalized_merge_title = self.normalize_title(merge_name)
@@ -97,10 +97,10 @@ class C64Dreams:
 
     # Look up the C64 Dreams name currrently configured for the given metakit database key
     def get_configured_name(self, key: str, use_default=True) -> Optional[str]:
-        metadata = self.metakit_database.get(key)
+        metadata = self.metakit_database.peek(key)
         group = metadata.get('group', key)
         if 'group' in metadata:
-            metadata = {**self.metakit_database.get(metadata['group']), **metadata}
+            metadata = {**self.metakit_database.peek(metadata['group']), **metadata}
 
         # First, confirm that we're actually dealing with a C64 Dreams game
         tags = metadata.get('tags', [])
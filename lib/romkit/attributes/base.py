@@ -7,6 +7,16 @@ class BaseAttribute:
     apply_to_overrides: bool = False
     empty: Set = set()
 
+    # Whether the value depends on anything other than the machine's DAT
+    # definition (e.g. metadata or configuration).  Rules for attributes that
+    # don't require metadata can be evaluated before metadata has been loaded.
+    requires_metadata: bool = True
+
+    # Whether the value can change while machines are being evaluated (e.g. it's
+    # assigned as a result of other rules).  Values for volatile attributes are
+    # never shared between rules.
+    volatile: bool = False
+
     def __init__(self, default: Any = None) -> None:
         self.default = default
 
@@ -18,9 +28,9 @@ class BaseAttribute:
     @classmethod
     def normalize(cls, value):
         if cls.data_type == str:
-            if isinstance(value, list):
+            if isinstance(value, (list, tuple)):
                 return [item and item.lower() for item in value]
-            elif isinstance(value, set):
+            elif isinstance(value, (set, frozenset)):
                 return {item and item.lower() for item in value}
             else:
                 return value and value.lower()
@@ -6,6 +6,7 @@ from romkit.attributes.base import BaseAttribute
 class BIOSAttribute(BaseAttribute):
     rule_name = 'bios'
     data_type = bool
+    requires_metadata = False
 
     def get(self, machine: Machine) -> bool:
         return machine.is_bios
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from romkit.attributes.base import BaseAttribute
+from romkit.models.machine import Machine
 
 # Machine type categorization (e.g. Games, Applications, Utilities, etc.)
 class CategoryAttribute(BaseAttribute):
@@ -9,7 +10,7 @@ class CategoryAttribute(BaseAttribute):
     data_type = str
 
     def set(self, machine: Machine, category: str) -> None:
-        machine.category = category
+        machine.category = Machine.intern(category)
 
     def get(self, machine: Machine) -> Optional[str]:
         return machine.category
@@ -6,6 +6,7 @@ from romkit.attributes.base import BaseAttribute
 class CollectionAttribute(BaseAttribute):
     rule_name = 'collections'
     data_type = str
+    volatile = True
 
     def get(self, machine: Machine) -> Set[str]:
         return machine.collections
@@ -9,7 +9,7 @@ class CustomAttribute(BaseAttribute):
     data_type = str
 
     def set(self, machine: Machine, custom: Dict[str, str]) -> None:
-        machine.custom.update(custom)
+        machine.custom = {**machine.custom, **custom}
 
     def get(self, machine: Machine) -> Set[str]:
         return set(machine.custom.keys())
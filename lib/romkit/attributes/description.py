@@ -6,6 +6,7 @@ from romkit.attributes.base import BaseAttribute
 class DescriptionsAttribute(BaseAttribute):
     rule_name = 'descriptions'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> str:
         return f'{machine.description} ({machine.comment})'
@@ -15,6 +16,7 @@ class DescriptionsAttribute(BaseAttribute):
 class CommentsAttribute(BaseAttribute):
     rule_name = 'comments'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> str:
         return machine.comment
@@ -24,6 +26,7 @@ class CommentsAttribute(BaseAttribute):
 class FlagDescriptionsAttribute(BaseAttribute):
     rule_name = 'flag_descriptions'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> str:
         return machine.flags_description
@@ -33,6 +36,7 @@ class FlagDescriptionsAttribute(BaseAttribute):
 class FlagAttribute(BaseAttribute):
     rule_name = 'flags'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> Set[str]:
         return machine.flags
@@ -42,6 +46,7 @@ class FlagAttribute(BaseAttribute):
 class FlagGroupsAttribute(BaseAttribute):
     rule_name = 'flag_groups'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> Set[str]:
         return machine.flag_groups
@@ -51,6 +56,7 @@ class FlagGroupsAttribute(BaseAttribute):
 class FlagGroupsTotalAttribute(BaseAttribute):
     rule_name = 'flag_groups_total'
     data_type = int
+    requires_metadata = False
 
     def get(self, machine: Machine) -> int:
         return len(machine.flag_groups)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from romkit.attributes.base import BaseAttribute
+from romkit.models.machine import Machine
 
 # Game developers
 class DevelopersAttribute(BaseAttribute):
@@ -9,7 +10,7 @@ class DevelopersAttribute(BaseAttribute):
     data_type = str
 
     def set(self, machine: Machine, developers: List[str]) -> None:
-        machine.developers.update(developers)
+        machine.developers = machine.developers.union(Machine.intern_all(developers))
 
     def get(self, machine: Machine) -> Set[str]:
         return machine.developers
@@ -6,6 +6,7 @@ from romkit.attributes.base import BaseAttribute
 class IsFavoriteAttribute(BaseAttribute):
     rule_name = 'favorite'
     data_type = bool
+    volatile = True
 
     def get(self, machine: Machine) -> bool:
         return machine.favorite
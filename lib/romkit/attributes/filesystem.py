@@ -4,7 +4,7 @@ from romkit.attributes.base import BaseAttribute
 from romkit.models.playlist import Playlist
 
 from pathlib import Path
-from typing import Set
+from typing import List, Set
 
 # Whether the machine is present on the filesystem
 class FilesystemAttribute(BaseAttribute):
@@ -12,14 +12,29 @@ class FilesystemAttribute(BaseAttribute):
     data_type = bool
 
     def __init__(self, *args, **kwargs) -> None:
-        super().__init__(*args, **kwargs)
+        self._installed_names = set()
+        self._pending_install_paths = []
 
-        self.installed_names = set()
+        super().__init__(*args, **kwargs)
 
+    # Install paths are only scanned once the attribute is first used
     def configure(self, install_paths: List[str] = [], **kwargs) -> None:
-        for path in install_paths:
+        self._pending_install_paths.extend(install_paths)
+
+    # Names of files found in the configured install paths
+    @property
+    def installed_names(self) -> Set[str]:
+        self.scan()
+        return self._installed_names
+
+    # Scans any install paths that haven't been scanned yet.  This must happen
+    # before the paths are modified (e.g. when directories are reset).
+    def scan(self) -> None:
+        for path in self._pending_install_paths:
             for installed_file in Path(path).glob("*"):
-                self.installed_names.add(installed_file.stem)
+                self._installed_names.add(installed_file.stem)
+
+        self._pending_install_paths.clear()
 
     def get(self, machine: Machine) -> bool:
         candidates = {
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from romkit.attributes.base import BaseAttribute
+from romkit.models.machine import Machine
 
 # Genre, as identified by the system or community
 class GenresAttribute(BaseAttribute):
@@ -9,7 +10,7 @@ class GenresAttribute(BaseAttribute):
     data_type = str
 
     def set(self, machine: Machine, genres: List[str]) -> None:
-        machine.genres.update(genres)
+        machine.genres = machine.genres.union(Machine.intern_all(genres))
 
     def get(self, machine: Machine) -> Set[str]:
         return machine.genres
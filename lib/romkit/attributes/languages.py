@@ -9,7 +9,7 @@ class LanguagesAttribute(BaseAttribute):
     data_type = str
 
     def set(self, machine: Machine, languages: List[str]) -> None:
-        machine.languages.update(languages)
+        machine.languages = machine.languages.union(languages)
 
     def get(self, machine: Machine) -> Set[str]:
         return machine.languages
@@ -8,8 +8,10 @@ class MechanicalAttribute(BaseAttribute):
     rule_name = metadata_name
     data_type = bool
 
+    # Metadata values are ignored: the machine's mechanical flag only comes from
+    # the DAT
     def set(self, machine: Machine, mechanical: bool) -> None:
-        machine.mechanical = mechanical
+        pass
 
     def get(self, machine: Machine) -> bool:
         return machine.is_mechanical
@@ -9,7 +9,7 @@ class MediaAttribute(BaseAttribute):
     data_type = str
 
     def set(self, machine: Machine, media: Dict[str, str]) -> None:
-        machine.media.update(media)
+        machine.media = {**machine.media, **media}
 
     def get(self, machine: Machine) -> Set[str]:
         return set(machine.media.keys())
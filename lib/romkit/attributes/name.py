@@ -9,6 +9,7 @@ from typing import Set
 class NameAttribute(BaseAttribute):
     rule_name = 'names'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> str:
         return machine.name
@@ -18,6 +19,7 @@ class NameAttribute(BaseAttribute):
 class TitleAttribute(BaseAttribute):
     rule_name = 'titles'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> str:
         return machine.title
@@ -27,6 +29,7 @@ class TitleAttribute(BaseAttribute):
 class DiscTitleAttribute(BaseAttribute):
     rule_name = 'disc_titles'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> str:
         return machine.disc_title
@@ -39,6 +42,7 @@ class DiscTitleAttribute(BaseAttribute):
 class VersionAttribute(BaseAttribute):
     rule_name = 'versions'
     data_type = float
+    requires_metadata = False
 
     # Semantic versioning, e.g. v1.2
     SEMANTIC_VERSION_REGEX = re.compile(r'[Vv ]([0-9]+\.[0-9]*)')
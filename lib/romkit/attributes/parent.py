@@ -6,6 +6,7 @@ from romkit.attributes.base import BaseAttribute
 class ParentNameAttribute(BaseAttribute):
     rule_name = 'parent_names'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> str:
         return machine.parent_name or machine.name
@@ -15,6 +16,7 @@ class ParentNameAttribute(BaseAttribute):
 class ParentTitleAttribute(BaseAttribute):
     rule_name = 'parent_titles'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> str:
         return machine.parent_title or machine.title
@@ -24,6 +26,7 @@ class ParentTitleAttribute(BaseAttribute):
 class ParentDiscTitleAttribute(BaseAttribute):
     rule_name = 'parent_disc_titles'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> str:
         return machine.parent_disc_title or machine.disc_title
@@ -33,6 +36,7 @@ class ParentDiscTitleAttribute(BaseAttribute):
 class IsParentAttribute(BaseAttribute):
     rule_name = 'is_parent'
     data_type = bool
+    requires_metadata = False
 
     def get(self, machine: Machine) -> bool:
         return machine.parent_name is None
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from romkit.attributes.base import BaseAttribute
+from romkit.models.machine import Machine
 
 # Game publisher
 class PublishersAttribute(BaseAttribute):
@@ -9,7 +10,7 @@ class PublishersAttribute(BaseAttribute):
     data_type = str
 
     def set(self, machine: Machine, publishers: List[str]) -> None:
-        machine.publishers.update(publishers)
+        machine.publishers = machine.publishers.union(Machine.intern_all(publishers))
 
     def get(self, machine: Machine) -> Set[str]:
         return machine.publishers
@@ -6,6 +6,7 @@ from romkit.attributes.base import BaseAttribute
 class ROMSetAttribute(BaseAttribute):
     rule_name = 'romsets'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> str:
         return machine.romset.name
@@ -6,6 +6,7 @@ from romkit.attributes.base import BaseAttribute
 class RunnableAttribute(BaseAttribute):
     rule_name = 'runnable'
     data_type = bool
+    requires_metadata = False
 
     def get(self, machine: Machine) -> bool:
         return machine.runnable and not machine.is_bios
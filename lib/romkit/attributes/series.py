@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from romkit.attributes.base import BaseAttribute
+from romkit.models.machine import Machine
 
 # The series the game belongs to
 class SeriesAttribute(BaseAttribute):
@@ -9,7 +10,7 @@ class SeriesAttribute(BaseAttribute):
     data_type = str
 
     def set(self, machine: Machine, series: List[str]) -> None:
-        machine.series.update(series)
+        machine.series = machine.series.union(Machine.intern_all(series))
 
     def get(self, machine: Machine) -> Optional[str]:
         return machine.series
@@ -6,6 +6,7 @@ from romkit.attributes.base import BaseAttribute
 class SystemAttribute(BaseAttribute):
     rule_name = 'systems'
     data_type = str
+    requires_metadata = False
 
     def get(self, machine: Machine) -> str:
         return machine.romset.system.name
@@ -9,7 +9,7 @@ class TagsAttribute(BaseAttribute):
     data_type = str
 
     def set(self, machine: Machine, tags: List[str]) -> None:
-        machine.tags.update(tags)
+        machine.tags = machine.tags.union(tags)
 
     def get(self, machine: Machine) -> Set[str]:
         return machine.tags
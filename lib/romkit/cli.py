@@ -4,10 +4,12 @@ import logging
 import os
 import sys
 from pathlib import Path
+from typing import Optional
 sys.path.append(str(Path(__file__).parent.parent))
 
 from romkit.systems import BaseSystem
 from romkit.output.set_encoder import SetEncoder
+from romkit.util.trace import tracer
 
 import json
 from argparse import ArgumentParser
@@ -18,8 +20,11 @@ class ROMKit:
         action: str,
         config_file: str,
         log_level: str = 'INFO',
+        profile_rules: Optional[str] = None,
+        trace_sample_rate: Optional[float] = None,
     ) -> None:
         self.action = action
+        self.profile_rules = profile_rules
 
         # Load configuration (and expand env vars)
         with open(config_file) as f:
@@ -27,12 +32,30 @@ class ROMKit:
 
         # Set up logger
         logging.basicConfig(level=getattr(logging, log_level), format='%(asctime)s - %(message)s', stream=sys.stdout)
+        tracer.configure(sample_rate=trace_sample_rate)
 
         # Build system
         self.system = BaseSystem.from_json(self.config)
+        if self.profile_rules:
+            self.system.profile_rules()
 
     def run(self, **kwargs) -> None:
         getattr(ROMKit, self.action)(self, **kwargs)
+        self.system.log_file_set_reuses()
+
+        if self.profile_rules:
+            self.write_rule_profile(self.profile_rules)
+
+    # Writes the stats tracked for each ruleset as JSON to the given path (or
+    # stderr if the path is "-")
+    def write_rule_profile(self, path: str) -> None:
+        profile = self.system.rule_profile()
+
+        if path == '-':
+            print(json.dumps(profile, indent=2), file=sys.stderr)
+        else:
+            with open(path, 'w') as file:
+                json.dump(profile, file, indent=2)
 
     # Lists machines filtered for this system
     def list(self) -> None:
@@ -60,6 +83,8 @@ def main() -> None:
     parser.add_argument(dest='action', help='Action to perform', choices=['list', 'install', 'organize', 'vacuum'])
     parser.add_argument(dest='config_file', help='JSON file containing the configuration')
     parser.add_argument('--log-level', dest='log_level', help='Log level', default='INFO', choices=['DEBUG', 'INFO', 'WARN', 'ERROR'])
+    parser.add_argument('--trace-sample-rate', dest='trace_sample_rate', type=float, metavar='RATE', help='Fraction of skipped machines to log in DEBUG mode (default: 1.0)')
+    parser.add_argument('--profile-rules', '--explain', dest='profile_rules', nargs='?', const='-', metavar='PATH', help='Write stats for each ruleset / rule as JSON to the given path (default: stderr)')
     args, action_args = parser.parse_known_args()
     args = {k: v for k, v in vars(args).items() if v is not None}
     ROMKit(**args).run(**{arg.split('=')[0]: arg.split('=')[1] for arg in action_args})
@@ -10,7 +10,7 @@ import time
 from collections import defaultdict
 from pathlib import Path
 from urllib.parse import quote, urljoin, urlparse
-from typing import Dict, List, Type
+from typing import Dict, List, Optional, Type
 
 # Provies a base class for discovery URL paths for romsets
 class BaseDiscovery:
@@ -20,7 +20,7 @@ class BaseDiscovery:
         urls: List[str],
         match: Dict[str, str],
         ttl: int = 86400,
-        downloader: Downloader = Downloader.instance(),
+        downloader: Optional[Downloader] = None,
     ):
         # Remove empty / blank urls
         self.urls = [url for url in urls if url]
@@ -28,7 +28,7 @@ class BaseDiscovery:
 
         # Download info
         self.ttl = ttl
-        self.downloader = downloader
+        self.downloader = downloader or Downloader.instance()
         self.download_dir = Path(f'{tempfile.gettempdir()}/discovery/{self.name}')
 
         # Processed global / machine mappings
@@ -3,7 +3,6 @@ from __future__ import annotations
 from romkit.discovery import BaseDiscovery
 from romkit.util.dict_utils import slice_only
 
-import ftplib
 from pathlib import Path
 from urllib.parse import urlparse
 import re
@@ -38,6 +37,8 @@ class FTPDiscovery(BaseDiscovery):
 
     # Downloads the list of files available at the given url (a recursive list)
     def _download_filelist(self, url: str, download_path: Path) -> List[str]:
+        import ftplib
+
         parsed_url = urlparse(url)
 
         # List remote paths
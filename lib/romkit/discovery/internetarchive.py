@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from romkit.discovery import BaseDiscovery
 
-import lxml.etree
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -10,6 +9,8 @@ class InternetArchiveDiscovery(BaseDiscovery):
     name = 'internetarchive'
 
     def list_paths(self, url: str) -> List[str]:
+        import lxml.etree
+
         # Download the file
         parsed_url = urlparse(url)
         archive_name = Path(parsed_url.path).name
@@ -3,6 +3,8 @@ from __future__ import annotations
 from romkit.models.collection import Collection
 from romkit.processing.ruleset import Ruleset
 
+from collections import defaultdict
+
 # Represents a collection of external metadata loaders
 class CollectionSet:
     def __init__(self) -> None:
@@ -30,3 +32,16 @@ class CollectionSet:
     # Lists the collections that are associated with this machine
     def list(self, machine: Machine) -> Set[str]:
         return {collection.name for collection in self.collections if collection.match(machine)}
+
+    # Lists the collections that are associated with each of the given machines
+    # (using the given filter engine).  Machines that aren't associated with any
+    # collection are excluded.
+    def list_all(self, machines: List[Machine], engine: str = 'machine') -> Dict[Machine, Set[str]]:
+        memberships = Ruleset.memberships({collection.name: collection.rules for collection in self.collections}, machines, engine)
+
+        machine_collections = defaultdict(set)
+        for name, members in memberships.items():
+            for machine in members:
+                machine_collections[machine].add(name)
+
+        return machine_collections
@@ -24,6 +24,14 @@ class Disk:
     def is_installable(xml: lxml.etree.ElementBase) -> bool:
         return xml.get('status') != Disk.STATUS_NO_DUMP
 
+    # Builds the attributes for a disk from an XML element
+    @staticmethod
+    def attrs_from_xml(xml: lxml.etree.ElementBase) -> dict:
+        return {
+            'name': xml.get('name'),
+            'sha1': xml.get('sha1'),
+        }
+
     # Builds context for formatting dirs/urls, including resource filenames
     @property
     def context(self) -> dict:
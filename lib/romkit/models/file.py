@@ -24,15 +24,19 @@ class File:
     def is_installable(xml: lxml.etree.ElementBase) -> bool:
         return xml.get('status') != File.STATUS_NO_DUMP
 
+    # Builds the attributes for a file from an XML element
+    @staticmethod
+    def attrs_from_xml(xml: lxml.etree.ElementBase) -> dict:
+        return {
+            'name': xml.get('name'),
+            'size': int(xml.get('size') or 0),
+            'crc': xml.get('crc'),
+        }
+
     # Builds a file from an XML element
     @classmethod
     def from_xml(cls, xml: lxml.etree.ElementBase, **kwargs) -> File:
-        return cls(
-            xml.get('name'),
-            int(xml.get('size') or 0),
-            xml.get('crc'),
-            **kwargs,
-        )
+        return cls(**cls.attrs_from_xml(xml), **kwargs)
 
     # Equality based on Unique ID
     def __eq__(self, other) -> bool:
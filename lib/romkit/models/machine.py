@@ -7,10 +7,14 @@ from romkit.models.playlist import Playlist
 from romkit.models.sample import Sample
 
 import hashlib
+import itertools
 import logging
 import re
+import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from types import MappingProxyType
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Union
 
 # Represents a Game/Device/BIOS
 class Machine:
@@ -19,9 +23,75 @@ class Machine:
     ROOT_REGEX = re.compile(r'^([^\\/]+)')
     NORMALIZED_TITLE_REGEX = re.compile(r'[^a-z0-9\+&\.]+')
 
+    # Number of normalized names to remember (see `normalize`)
+    NORMALIZE_CACHE_SIZE = 2 ** 16
+
     # The names of resources that have custom handling
     CUSTOM_RESOURCE_NAMES = {'machine', 'disk', 'sample', 'dat', 'playlist'}
 
+    # Shared defaults for empty collections.  Since these are shared between all
+    # machines, they're immutable -- collections must be replaced, not modified.
+    EMPTY_SET = frozenset()
+    EMPTY_DICT = MappingProxyType({})
+    EMPTY_LIST = ()
+
+    __slots__ = [
+        '_derived',
+        '_file_sets',
+        '_evaluated_values',
+        '_resource',
+        'romset',
+        '_name',
+        '_alt_names',
+        'dependent_machines',
+
+        # Internal metadata
+        '_description',
+        'comment',
+        'orientation',
+        'category',
+        'sourcefile',
+        'controls',
+        'peripherals',
+        'buttons',
+
+        # File data
+        '_parent_name',
+        'bios_name',
+        'sample_name',
+        'device_names',
+        'rom_table',
+        'rom_rows',
+        'disks',
+        'is_bios',
+        'is_mechanical',
+        'runnable',
+
+        # External metadata
+        'group_name',
+        'year',
+        'developers',
+        'publishers',
+        'age_rating',
+        'genres',
+        'collections',
+        'tags',
+        'custom',
+        'languages',
+        'rating',
+        'players',
+        'discs',
+        'emulator_rating',
+        'manual',
+        'media',
+        'series',
+
+        # Automatic defaults
+        'emulator',
+        'favorite',
+        'custom_context',
+    ]
+
     def __init__(self,
         romset: ROMSet,
         name: str,
@@ -69,9 +139,20 @@ class Machine:
         # Additional context to include when rendering resource paths
         custom_context: dict = None,
     ) -> None:
+        # Values derived from the machine's DAT definition (see `_derive`)
+        self._derived = {}
+
+        # Sets of files derived from this machine's files and its dependencies
+        # (see `_derive_files`)
+        self._file_sets = {}
+
+        # Attribute values shared between rules during an evaluation pass (see
+        # EvaluationContext)
+        self._evaluated_values = None
+
         self.romset = romset
         self.name = name
-        self.alt_names = []
+        self._alt_names = self.EMPTY_LIST
 
         # Keeps track of any other machines that are needed to run this one, such as:
         # * Parent
@@ -79,52 +160,55 @@ class Machine:
         # * Device
         # 
         # Maps name -> Machine
-        self.dependent_machines = {}
+        self.dependent_machines = self.EMPTY_DICT
 
         # Internal metadata
         self.description = description or name
         self.comment = comment
         self.orientation = orientation
-        self.category = category
-        self.sourcefile = sourcefile
-        self.controls = controls or set()
-        self.peripherals = peripherals or set()
-        self.buttons = buttons or []
+        self.category = self.intern(category)
+        self.sourcefile = self.intern(sourcefile)
+        self.controls = controls or self.EMPTY_SET
+        self.peripherals = peripherals or self.EMPTY_SET
+        self.buttons = buttons or self.EMPTY_LIST
 
         # File data
         self.parent_name = parent_name
-        self.bios_name = bios_name
-        self.sample_name = sample_name
-        self.device_names = device_names or set()
-        self.roms = roms or set()
-        self.disks = disks or set()
+        self.bios_name = self.intern(bios_name)
+        self.sample_name = self.intern(sample_name)
+        self.device_names = self.intern_all(device_names) or self.EMPTY_SET
+        self.rom_table = romset.rom_table
+        self.rom_rows = range(0)
+        if roms:
+            self.roms = roms
+        self.disks = disks or self.EMPTY_SET
         self.is_bios = is_bios
         self.is_mechanical = is_mechanical
         self.runnable = runnable
 
         # External attributes
         self.year = year
-        self.developers = developers or set()
-        self.publishers = publishers or set()
+        self.developers = self.intern_all(developers) or self.EMPTY_SET
+        self.publishers = self.intern_all(publishers) or self.EMPTY_SET
         self.age_rating = age_rating
-        self.genres = genres or set()
-        self.collections = collections or set()
-        self.tags = tags or set()
-        self.custom = custom or {}
-        self.languages = languages or set()
+        self.genres = self.intern_all(genres) or self.EMPTY_SET
+        self.collections = collections or self.EMPTY_SET
+        self.tags = tags or self.EMPTY_SET
+        self.custom = custom or self.EMPTY_DICT
+        self.languages = languages or self.EMPTY_SET
         self.rating = rating
         self.players = players
         self.discs = discs or 1
         self.emulator_rating = emulator_rating
         self.manual = manual
-        self.media = media or {}
-        self.series = series or set()
+        self.media = media or self.EMPTY_DICT
+        self.series = series or self.EMPTY_SET
         self.group_name = group_name or self.parent_title or self.title
 
         # Automatic defaults
         self.emulator = romset.emulators[0] if romset.emulators else None
         self.favorite = False
-        self.custom_context = custom_context or {}
+        self.custom_context = custom_context or self.EMPTY_DICT
 
         self._resource = None
 
@@ -135,6 +219,13 @@ class Machine:
 
     @classmethod
     def from_xml(cls, romset: ROMSet, xml: lxml.etree.ElementBase) -> Machine:
+        return cls.from_dict(romset, cls.attrs_from_xml(romset, xml))
+
+    # Builds the attributes for a machine from the given XML element.  These
+    # attributes are compatible with `from_dict` and only consist of basic
+    # types so that they can be persisted / shared between processes.
+    @classmethod
+    def attrs_from_xml(cls, romset: ROMSet, xml: lxml.etree.ElementBase) -> dict:
         name = xml.get('name')
 
         # Parent / BIOS
@@ -186,56 +277,78 @@ class Machine:
                 description = child.text
             elif tag == 'disk':
                 if Disk.is_installable(child):
-                    dumped_disks.append(child)
+                    dumped_disks.append(Disk.attrs_from_xml(child))
             elif tag == 'rom':
                 if has_machine_template and File.is_installable(child):
-                    dumped_roms.append(child)
-
-        machine = cls(
-            romset,
-            name,
-            description=description,
-            comment=comment,
-            category=category,
-            is_bios=is_bios,
-            is_mechanical=is_mechanical,
-            runnable=runnable,
-            parent_name=parent_name,
-            bios_name=bios_name,
-            sample_name=sample_name,
-            device_names=device_names,
-            sourcefile=sourcefile,
-            year=year,
-            developers=manufacturer and {manufacturer},
-        )
-
-        # Disks
-        machine.disks = {Disk(machine, disk_xml.get('name'), disk_xml.get('sha1')) for disk_xml in dumped_disks}
+                    dumped_roms.append(File.attrs_from_xml(child))
+
+        attrs = {
+            'name': name,
+            'description': description,
+            'comment': comment,
+            'category': category,
+            'is_bios': is_bios,
+            'is_mechanical': is_mechanical,
+            'runnable': runnable,
+            'parent_name': parent_name,
+            'bios_name': bios_name,
+            'sample_name': sample_name,
+            'device_names': device_names,
+            'sourcefile': sourcefile,
+            'year': year,
+            'developers': manufacturer and {manufacturer},
+            'disks': dumped_disks,
+        }
 
         # ROMs
         if has_machine_template:
-            file_identifier = romset.resource_templates['machine'].file_identifier
-            machine.roms = {File.from_xml(rom_xml, file_identifier=file_identifier) for rom_xml in dumped_roms}
+            attrs['roms'] = dumped_roms
 
-        return machine
+        return attrs
 
+    # Builds a machine from the given attributes.  If `files` is disabled, the
+    # machine's disks / roms won't be loaded until `load_files` is called.
     @classmethod
-    def from_dict(cls, romset: ROMSet, attrs: dict) -> Machine:
-        machine_attrs = {key: attrs[key] for key in attrs if key not in ['disks', 'roms']}
+    def from_dict(cls, romset: ROMSet, attrs: dict, files: bool = True) -> Machine:
+        machine_attrs = {key: attrs[key] for key in attrs if key not in ['disks', 'roms', 'id']}
         machine = cls(romset, **machine_attrs)
 
+        if files:
+            machine.load_files(attrs)
+
+        return machine
+
+    # Loads the disks / roms defined in the given attributes
+    def load_files(self, attrs: dict) -> None:
         # Disks
         if 'disks' in attrs:
-            machine.disks = {Disk(machine, **disk_attrs) for disk_attrs in attrs['disks']}
+            self.disks = {Disk(self, **disk_attrs) for disk_attrs in attrs['disks']} or self.EMPTY_SET
 
         # ROMs
         if 'roms' in attrs:
-            machine.roms = {
-                File(**rom_attrs, file_identifier=romset.resource_templates['machine'].file_identifier)
-                for rom_attrs in attrs['roms']
-            }
+            self.rom_rows = self.rom_table.extend(attrs['roms'])
 
-        return machine
+        self._reset_file_derived()
+
+        # Previously generated id (e.g. from a dat cache)
+        if 'id' in attrs:
+            self._derived['id'] = attrs['id']
+        else:
+            self._derived.pop('id', None)
+
+    # Links this machine to the given machines it depends on (parent, bios, devices)
+    def link_dependencies(self, machines: Dict[str, Machine]) -> None:
+        if machines:
+            self.dependent_machines = {**self.dependent_machines, **machines}
+
+        self._reset_file_derived()
+
+    # Moves this machine's ROMs into the given table (e.g. when the romset's table
+    # is being compacted)
+    def move_roms(self, rom_table: ROMTable) -> None:
+        self.rom_rows = rom_table.extend_from(self.rom_table, self.rom_rows)
+        self.rom_table = rom_table
+        self._reset_file_derived()
 
     # Tracks this machine so that it can be referenced later from the romset
     def track(self) -> None:
@@ -246,10 +359,34 @@ class Machine:
     # without having to re-download from the source.
     @property
     def id(self) -> str:
-        rom_id_type = self.romset.system.rom_id_type
+        return self._derive('id', self._build_id)
+
+    def _build_id(self) -> str:
+        return self._id_for(self.romset, self.name, self.roms)
+
+    # Generates the unique identifier for the machine with the given attributes
+    # (see `attrs_from_xml`) without having to build the machine
+    @classmethod
+    def id_from_attrs(cls, romset: ROMSet, attrs: dict) -> str:
+        # Like the machine's set of roms, only the first rom for a given file id is used
+        machine_template = romset.resource_templates.get('machine')
+        file_identifier = machine_template and machine_template.file_identifier
+
+        roms = {}
+        for rom_attrs in attrs.get('roms', []):
+            rom = File(**rom_attrs, file_identifier=file_identifier)
+            if rom.id not in roms:
+                roms[rom.id] = rom
+
+        return cls._id_for(romset, attrs['name'], roms.values())
+
+    # Generates the unique identifier for a machine with the given name / roms
+    @staticmethod
+    def _id_for(romset: ROMSet, name: str, roms: Iterable[File]) -> str:
+        rom_id_type = romset.system.rom_id_type
         if rom_id_type == 'crc':
             # Exclude cue files since they will always change when the name changes
-            roms = filter(lambda file: Path(file.name).suffix != '.cue', self.roms)
+            roms = filter(lambda file: Path(file.name).suffix != '.cue', roms)
             rom_crcs = [file.crc for file in roms]
 
             # Sort to ensure any change in rom order has no effect
@@ -258,7 +395,7 @@ class Machine:
             # Generate hash based on the underlying ROMs
             machine_id = hashlib.sha1(''.join(rom_crcs).encode()).hexdigest()
         elif rom_id_type == 'name':
-            machine_id = self.name
+            machine_id = name
         else:
             raise Exception(f'Invalid rom id type: {rom_id_type}')
 
@@ -273,9 +410,13 @@ class Machine:
 
         return context
 
-    # Builds context for formatting dirs/urls
+    # Builds context for formatting dirs/urls.  Like `resource`, this is expected
+    # to only be used once the machine's dependencies have been resolved.
     @property
     def _resource_context(self) -> dict:
+        return self._derive('resource_context', self._build_resource_context)
+
+    def _build_resource_context(self) -> dict:
         return {
             'machine': self.name,
             'machine_letter': ('0' if self.name[0].isnumeric() else self.name[0].upper()),
@@ -290,6 +431,91 @@ class Machine:
             **self.custom_context,
         }
 
+    # Name of the machine as defined in the DAT
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, value: str) -> None:
+        self._name = value
+        self._derived.clear()
+
+    # Description of the machine, typically including flags
+    @property
+    def description(self) -> str:
+        return self._description
+
+    @description.setter
+    def description(self, value: str) -> None:
+        self._description = value
+        self._derived.clear()
+
+    # Name of the machine this is a clone of, if applicable
+    @property
+    def parent_name(self) -> Optional[str]:
+        return self._parent_name
+
+    @parent_name.setter
+    def parent_name(self, value: Optional[str]) -> None:
+        self._parent_name = self.intern(value)
+        self._derived.clear()
+
+    # Files defined for this machine in the DAT
+    @property
+    def roms(self) -> Set[File]:
+        return self.rom_table.files(self.rom_rows)
+
+    @roms.setter
+    def roms(self, value: Set[File]) -> None:
+        self.rom_rows = self.rom_table.extend({'name': file.name, 'size': file.size, 'crc': file.crc} for file in value)
+        self._derived.pop('id', None)
+        self._reset_file_derived()
+
+    # Unique ids (see ROMTable) of the files defined for this machine in the DAT
+    @property
+    def rom_ids(self) -> Set[Union[int, str, None]]:
+        return self._derive_files('rom_ids', lambda: self.rom_table.ids(self.rom_rows))
+
+    # Alternate names this machine is known by (e.g. from previous romsets)
+    @property
+    def alt_names(self) -> List[str]:
+        return self._alt_names
+
+    @alt_names.setter
+    def alt_names(self, value: List[str]) -> None:
+        self._alt_names = value
+        self._reset_file_derived()
+
+    # Resets the values that are derived from the machine's files / alternate names /
+    # dependencies.  The id is kept since it only depends on the machine's own roms.
+    def _reset_file_derived(self) -> None:
+        self._derived.pop('resource_context', None)
+        self._file_sets.clear()
+
+    # Looks up a set derived from this machine's files and those of its dependencies,
+    # building it via the given function if it hasn't been generated yet.  Since
+    # these sets are shared between callers, they're immutable.
+    def _derive_files(self, key: str, builder: Callable[[], Set]) -> FrozenSet:
+        file_sets = self._file_sets
+        if key in file_sets:
+            self.romset.file_set_reuses[key.split(':')[0]] += 1
+            return file_sets[key]
+
+        value = file_sets[key] = frozenset(builder())
+        return value
+
+    # Looks up a value derived from the machine's name / description / parent,
+    # building it via the given function if it hasn't been generated yet.  These
+    # values get reset whenever the attributes they're derived from change.
+    def _derive(self, key: str, builder: Callable[[], Any]) -> Any:
+        derived = self._derived
+        if key in derived:
+            return derived[key]
+
+        value = derived[key] = builder()
+        return value
+
     @property
     def is_clone(self) -> bool:
         return self.parent_name is not None
@@ -297,27 +523,27 @@ class Machine:
     # Machine title (no extension, no flags), e.g. Chrono Cross
     @property
     def title(self) -> str:
-        return self.title_from(self.name)
+        return self._derive('title', lambda: self.title_from(self.name))
 
     # Machine title (no extension, no flags except disc number), e.g. Chrono Cross (Disc 1)
     @property
     def disc_title(self) -> str:
-        return self.title_from(self.name, disc=True)
+        return self._derive('disc_title', lambda: self.title_from(self.name, disc=True))
 
     # Parent machine title (no extension, no flags except for disc name)
     @property
     def parent_title(self) -> Optional[str]:
-        return self.parent_name and self.title_from(self.parent_name)
+        return self._derive('parent_title', lambda: self.parent_name and self.title_from(self.parent_name))
 
     # Parent machine title (no extension, no flags except for disc name)
     @property
     def parent_disc_title(self) -> Optional[str]:
-        return self.parent_name and self.title_from(self.parent_name, disc=True)
+        return self._derive('parent_disc_title', lambda: self.parent_name and self.title_from(self.parent_name, disc=True))
 
     # Name of the playlist this machine belongs to (even if it's a playlist of 1)
     @property
     def playlist_name(self) -> str:
-        return Playlist.name_from(self.name)
+        return self._derive('playlist_name', lambda: Playlist.name_from(self.name))
 
     # The title of the group this machine is assigned to
     @property
@@ -340,16 +566,44 @@ class Machine:
 
         return title
 
+    # Interns the given string so that values repeated across machines (e.g.
+    # categories) share the same object in memory
+    @staticmethod
+    def intern(value: Optional[str]) -> Optional[str]:
+        if isinstance(value, str):
+            return sys.intern(value)
+        else:
+            return value
+
+    # Interns each of the given strings, returning a new set
+    @classmethod
+    def intern_all(cls, values: Optional[Iterable[str]]) -> Optional[Set[str]]:
+        if values:
+            return {cls.intern(value) for value in values}
+        else:
+            return values
+
     # Normalizes the given machine name by removing characters that may differ
     # between romsets
+    # 
+    # The same names are normalized many times (e.g. titles shared by clones), so
+    # results are memoized.
     @classmethod
     def normalize(cls, name: str) -> str:
         if name:
-            return cls.NORMALIZED_TITLE_REGEX.sub('', name.lower())
+            return cls._normalize(name)
+
+    @staticmethod
+    @lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+    def _normalize(name: str) -> str:
+        return Machine.NORMALIZED_TITLE_REGEX.sub('', name.lower())
 
     # Flags part of the description
     @property
     def flags_description(self) -> str:
+        return self._derive('flags_description', self._build_flags_description)
+
+    def _build_flags_description(self) -> str:
         flag_start = self.description.find('(')
         if flag_start >= 0:
             return self.description[flag_start:]
@@ -359,11 +613,14 @@ class Machine:
     # Groups of flags from the description
     @property
     def flag_groups(self) -> Set[str]:
-        return self.FLAG_REGEX.findall(self.flags_description)
+        return self._derive('flag_groups', lambda: self.FLAG_REGEX.findall(self.flags_description))
 
     # Individual flags from the description
     @property
     def flags(self) -> Set[str]:
+        return self._derive('flags', self._build_flags)
+
+    def _build_flags(self) -> Set[str]:
         values = set()
         for group in self.flag_groups:
             values.update(self.FLAG_DELIMITER_REGEX.split(group))
@@ -450,51 +707,69 @@ class Machine:
     # utilize the @merge property on ROMs to fix this, but at the
     # moment there's no need.
     def roms_from(self, machine: Machine) -> Set[File]:
-        machine_roms = machine.roms_from_self
-        non_merged_roms = self.non_merged_roms
+        return self._derive_files(f'roms_from:{machine.name}', lambda: self.rom_table.files(self.non_merged_rom_rows, self.rom_ids_from(machine)))
 
-        return set(rom for rom in non_merged_roms if rom in machine_roms)
+    # Unique ids of the ROMs installed directly from the given machine
+    def rom_ids_from(self, machine: Machine) -> Set[Union[int, str, None]]:
+        return self._derive_files(f'rom_ids_from:{machine.name}', lambda: self.non_merged_rom_ids & machine.rom_ids_from_self)
 
     # ROMs installed directly from this machine
     @property
     def roms_from_self(self) -> Set[File]:
+        return self._derive_files('roms_from_self', lambda: self.rom_table.files(self.rom_rows, self.rom_ids_from_self))
+
+    # Unique ids of the ROMs installed directly from this machine
+    @property
+    def rom_ids_from_self(self) -> Set[Union[int, str, None]]:
+        return self._derive_files('rom_ids_from_self', self._build_rom_ids_from_self)
+
+    def _build_rom_ids_from_self(self) -> Set[Union[int, str, None]]:
         # roms does *not* include roms from device machines, so we only need
         # to exclude those roms from the parent and bios
-        roms = self.roms
+        rom_ids = self.rom_ids
         if self.parent_machine:
-            roms = roms - self.parent_machine.roms
+            rom_ids -= self.parent_machine.rom_ids
 
         if self.bios_machine:
-            roms = roms - self.bios_machine.roms
+            rom_ids -= self.bios_machine.rom_ids
 
-        return roms
+        return rom_ids
 
     # All ROMs expected to be in the non-merged build (from self, parent, bios, and devices)
     @property
     def non_merged_roms(self) -> Set[File]:
+        return self._derive_files('non_merged_roms', lambda: self.rom_table.files(self.non_merged_rom_rows))
+
+    # Unique ids of all ROMs expected to be in the non-merged build
+    @property
+    def non_merged_rom_ids(self) -> Set[Union[int, str, None]]:
+        return self._derive_files('non_merged_rom_ids', lambda: self.rom_table.ids(self.non_merged_rom_rows))
+
+    # Rows in the rom table for all ROMs expected to be in the non-merged build.
+    # Note that the same ROM may be included multiple times.
+    @property
+    def non_merged_rom_rows(self) -> Iterator[int]:
         # Define the machines containing the lists of roms required
         # for a non-merged archive
         machines = [self] # includes self, parent, and bios
         machines.extend(self.device_machines)
 
-        # Build up the full set of ROMs required
-        roms = set()
-        for machine in machines:
-            roms.update(machine.roms)
-
-        return roms
+        return itertools.chain.from_iterable(machine.rom_rows for machine in machines)
 
     # Root folder that the ROMs live in (may not be applicable to the current romset)
     @property
     def rom_root(self) -> Optional[str]:
-        if self.roms:
-            return self.ROOT_REGEX.search(next(iter(self.roms)).name).group()
+        if self.rom_rows:
+            return self.ROOT_REGEX.search(self.rom_table.name(self.rom_rows[0])).group()
         else:
             return ''
 
     # Disks installed from the parent
     @property
     def disks_from_parent(self) -> Set[Disk]:
+        return self._derive_files('disks_from_parent', self._build_disks_from_parent)
+
+    def _build_disks_from_parent(self) -> Set[Disk]:
         if self.parent_machine:
             # Avoid set intersection to guarantee we'll use the parent's disks
             # instead of ours since machines will be compatible with the
@@ -506,7 +781,7 @@ class Machine:
     # Disks installed directly from this machine
     @property
     def disks_from_self(self) -> Set[Disk]:
-        return self.disks - self.disks_from_parent
+        return self._derive_files('disks_from_self', lambda: self.disks - self.disks_from_parent)
 
     # Audio sample
     @property
@@ -622,7 +897,11 @@ class Machine:
     # Determines whether the locally installed set of ROMs is equal to the full set of
     # non_merged roms
     def is_valid_nonmerged(self) -> bool:
-        return not self.resource or not self.non_merged_roms or self.resource.contains(self.non_merged_roms)
+        if not self.resource:
+            return True
+
+        rom_ids = self.non_merged_rom_ids
+        return not rom_ids or self.resource.contains(rom_ids, self.rom_table)
 
     # Runs any actions required before the machine is installed
     def before_install(self) -> None:
@@ -684,20 +963,20 @@ class Machine:
             return
 
         # Find matching ROMs to install
-        roms = self.roms_from(machine)
-        if self.resource.predefined and not roms:
+        rom_ids = self.rom_ids_from(machine)
+        if self.resource.predefined and not rom_ids:
             return
 
-        if self.resource.contains(roms):
+        if self.resource.contains(rom_ids, self.rom_table):
             logging.info(f'[{self.name}] Already installed {machine.name}')
         else:
             # Re-download the source machine if it's missing files
-            if not machine.resource.download_path.contains(roms):
+            if not machine.resource.download_path.contains(rom_ids, self.rom_table):
                 logging.info(f'[{self.name}] Downloading {machine.name}')
                 machine.resource.download(force=True)
 
             logging.info(f'[{self.name}] Installing from {machine.name}')
-            self.resource.install(machine.resource, files=roms, force=True)
+            self.resource.install(machine.resource, files=self.roms_from(machine), force=True)
 
     # Removes unnecessary files from the archive, if applicable
     def clean(self) -> None:
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from romkit.models.machine import Machine
+
+from typing import Dict, Iterable
+
+# Tracks the machines in a romset that may be needed as a dependency of
+# another machine (parents, bios, devices) while the romset is being filtered.
+class MachineStore:
+    def __init__(self, romset: ROMSet, metadata: Metadata) -> None:
+        self.romset = romset
+        self.metadata = metadata
+
+        # Machines being tracked (name -> Machine)
+        self.machines = {}
+
+    # Tracks a machine that's already in use elsewhere (e.g. because it passed
+    # the filters)
+    def track(self, machine: Machine) -> None:
+        self.machines[machine.name] = machine
+
+    # Adds a machine that *may* be needed as a dependency, loading its files from
+    # the attributes it was built from
+    def add(self, machine: Machine, attrs: dict) -> None:
+        machine.load_files(attrs)
+        self.track(machine)
+
+    # Looks up the machines with the given names that are in this store
+    def slice(self, names: Iterable[str]) -> Dict[str, Machine]:
+        machines = self.machines
+        return {name: machines[name] for name in names if name in machines}
+
+    # Releases any resources held by this store
+    def close(self) -> None:
+        self.machines = {}
+
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from romkit.models.file import File
+
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+# Compact storage for the ROMs of the machines loaded from a romset's DAT.
+#
+# Rather than every machine holding its own set of File objects, each ROM is
+# stored as a row in a set of typed arrays (name reference, CRC32, size).  Names
+# are interned so that ROMs shared between machines (e.g. parent / clone) only
+# store their name once.  Machines then reference the range of rows that were
+# added for them.
+#
+# Each row has an id which is used for comparing ROMs between machines.  Like
+# File, this is based on either the ROM's name or CRC depending on the
+# configured file identifier.
+class ROMTable:
+    # Value stored when a ROM has no CRC or its CRC can't be represented as
+    # a 32-bit integer (see `_raw_crcs`)
+    NO_CRC = -1
+
+    def __init__(self, file_identifier: Optional[str] = None) -> None:
+        self.file_identifier = file_identifier
+
+        # Unique names and their position in `_names`
+        self._names: List[str] = []
+        self._name_indexes: Dict[str, int] = {}
+
+        # Columns, one entry per row
+        self._name_refs = array('L')
+        self._crcs = array('q')
+        self._sizes = array('Q')
+
+        # CRCs that were defined, but couldn't be stored as integers (e.g. they
+        # weren't 8 hex characters).  Maps row -> crc
+        self._raw_crcs: Dict[int, str] = {}
+
+    # Number of rows in the table
+    def __len__(self) -> int:
+        return len(self._crcs)
+
+    # Adds a ROM to the table, returning the row it was stored in
+    def add(self, name: str, size: int, crc: Optional[str]) -> int:
+        row = len(self._crcs)
+
+        name_index = self._name_indexes.get(name)
+        if name_index is None:
+            name_index = self._name_indexes[name] = len(self._names)
+            self._names.append(sys.intern(name))
+
+        crc_value = self._crc_value(crc)
+        if crc and crc_value == self.NO_CRC:
+            self._raw_crcs[row] = crc.lower()
+
+        self._name_refs.append(name_index)
+        self._crcs.append(crc_value)
+        self._sizes.append(size or 0)
+
+        return row
+
+    # Adds the given ROMs (as defined by File.attrs_from_xml) to the table,
+    # returning the range of rows they were stored in
+    def extend(self, roms: Iterable[dict]) -> range:
+        start = len(self._crcs)
+        for rom in roms:
+            self.add(rom['name'], rom['size'], rom['crc'])
+
+        return range(start, len(self._crcs))
+
+    # Copies the given rows from another table into this one, returning the range
+    # of rows they were stored in
+    def extend_from(self, table: ROMTable, rows: Iterable[int]) -> range:
+        start = len(self._crcs)
+        for row in rows:
+            self.add(table.name(row), table.size(row), table.crc(row))
+
+        return range(start, len(self._crcs))
+
+    # Name of the ROM in the given row
+    def name(self, row: int) -> str:
+        return self._names[self._name_refs[row]]
+
+    # Size of the ROM in the given row
+    def size(self, row: int) -> int:
+        return self._sizes[row]
+
+    # CRC (lowercase hex) of the ROM in the given row
+    def crc(self, row: int) -> Optional[str]:
+        crc_value = self._crcs[row]
+        if crc_value != self.NO_CRC:
+            return f'{crc_value:08x}'
+        else:
+            return self._raw_crcs.get(row)
+
+    # Unique id of the ROM in the given row
+    def id(self, row: int) -> Union[int, str, None]:
+        if self.file_identifier == 'name':
+            return self._name_refs[row]
+
+        crc_value = self._crcs[row]
+        if crc_value != self.NO_CRC:
+            return crc_value
+        else:
+            return self._raw_crcs.get(row)
+
+    # Unique ids of the ROMs in the given rows
+    def ids(self, rows: Iterable[int]) -> Set[Union[int, str, None]]:
+        if self.file_identifier == 'name':
+            name_refs = self._name_refs
+            return {name_refs[row] for row in rows}
+        else:
+            return {self.id(row) for row in rows}
+
+    # Unique ids of the given files (e.g. those listed in a resource path).  The
+    # resulting ids can be compared against the ids of rows in this table.
+    def ids_of(self, files: Iterable[File]) -> Set[Union[int, str, None]]:
+        if self.file_identifier == 'name':
+            # Names that aren't in the table can't match any row
+            return {self._name_indexes.get(file.name, file.name) for file in files}
+        else:
+            ids = set()
+            for file in files:
+                crc_value = self._crc_value(file.crc)
+                ids.add(crc_value if crc_value != self.NO_CRC else file.crc)
+            return ids
+
+    # Builds a file reference for the ROM in the given row
+    def file(self, row: int) -> File:
+        return File(self.name(row), self.size(row), self.crc(row), self.file_identifier)
+
+    # Builds file references for the ROMs in the given rows.  If ids are
+    # provided, then only those rows with a matching id are included.
+    #
+    # Like a set of File objects, the first row for a given id wins.
+    def files(self, rows: Iterable[int], ids: Optional[Set[Union[int, str, None]]] = None) -> Set[File]:
+        files = {}
+        for row in rows:
+            row_id = self.id(row)
+            if row_id not in files and (ids is None or row_id in ids):
+                files[row_id] = self.file(row)
+
+        return set(files.values())
+
+    # Converts the given CRC to an integer, if possible
+    @classmethod
+    def _crc_value(cls, crc: Optional[str]) -> int:
+        if crc and len(crc) == 8:
+            try:
+                crc_value = int(crc, 16)
+            except ValueError:
+                return cls.NO_CRC
+
+            # Only use values that can be converted back to the original CRC
+            if f'{crc_value:08x}' == crc.lower():
+                return crc_value
+
+        return cls.NO_CRC
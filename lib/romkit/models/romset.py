@@ -2,18 +2,41 @@ from __future__ import annotations
 
 from romkit.discovery import BaseDiscovery
 from romkit.models.machine import Machine
+from romkit.models.machine_store import MachineStore
+from romkit.models.rom_table import ROMTable
+from romkit.processing.dat_cache import DATCache
+from romkit.processing.dat_splitter import DATSplitter
 from romkit.processing.ruleset import Ruleset
 from romkit.resources.downloader import Downloader
 from romkit.resources.resource import ResourceTemplate
 from romkit.util.dict_utils import slice_only
+from romkit.util.trace import tracer
 
-import logging
-import lxml.etree
+import io
 import tempfile
-from typing import Dict, Generator, List, Optional
+from collections import Counter
+from typing import Dict, Generator, Iterable, List, Optional, Set, Tuple, Union
+
+# The romset whose dat is being parsed by a worker process.  This is inherited
+# from the parent process when the worker is forked rather than being serialized.
+_worker_romset = None
+
+def _init_worker(romset: ROMSet) -> None:
+    global _worker_romset
+    _worker_romset = romset
+
+# Parses the machine attributes in the given byte range of the dat in a worker process
+def _parse_dat_chunk(byte_range: Tuple[int, int]) -> List[dict]:
+    return list(_worker_romset._parse_dat_xml(_worker_romset._dat_splitter().read(*byte_range)))
 
 # Represents a reference ROM collection
 class ROMSet:
+    # Number of chunks to split the dat into per worker when parsing in parallel
+    DAT_CHUNKS_PER_WORKER = 4
+
+    # Number of machines to evaluate at a time with the "bitset" filter engine
+    FILTER_BATCH_SIZE = 1024
+
     def __init__(self,
         system: BaseSystem,
         name: str,
@@ -24,6 +47,8 @@ class ROMSet:
         datlist: Optional[List[str]] = None,
         filters: Optional[Ruleset] = None,
         enabled: bool = True,
+        dat_cache: bool = True,
+        dat_workers: int = 1,
     ):
         self.system = system
         self.name = name
@@ -33,7 +58,14 @@ class ROMSet:
         self.discovery = discovery
         self.filters = filters
         self.enabled = enabled
+        self.dat_cache = dat_cache
+        self.dat_workers = dat_workers
         self.downloader = system.downloader
+        self._rom_table = None
+
+        # Number of times a machine's file set (e.g. non_merged_roms) was reused
+        # rather than rebuilt
+        self.file_set_reuses = Counter()
 
         # Internal dat list for systems that don't have dat files
         if datlist:
@@ -53,6 +85,8 @@ class ROMSet:
             'emulators',
             'datlist',
             'enabled',
+            'dat_cache',
+            'dat_workers',
         ]), **kwargs)
 
         if 'filters' in json:
@@ -98,6 +132,19 @@ class ROMSet:
         if resource_template:
             return resource_template.render(**context)
 
+    # Shared storage for the ROMs of machines loaded from this romset.  A new table
+    # is started each time the romset is filtered.
+    @property
+    def rom_table(self) -> ROMTable:
+        if self._rom_table is None:
+            self._rom_table = self._build_rom_table()
+        return self._rom_table
+
+    # Builds an empty table for storing this romset's ROMs
+    def _build_rom_table(self) -> ROMTable:
+        machine_template = self.resource_templates.get('machine')
+        return ROMTable(machine_template and machine_template.file_identifier)
+
     # Gets the DAT file for this romset
     @property
     def dat(self) -> Optional[Resource]:
@@ -110,57 +157,282 @@ class ROMSet:
 
     # Looks up the machines in the dat file
     def iter_machines(self) -> Generator[None, Machine, None]:
+        for machine_attrs in self.iter_machine_attrs():
+            yield Machine.from_dict(self, machine_attrs)
+
+    # Looks up the attributes of each machine in the dat file.  When enabled,
+    # the parsed attributes are cached alongside the dat file so that future
+    # runs can avoid re-parsing the XML.
+    def iter_machine_attrs(self) -> Generator[None, dict, None]:
         if not self.enabled:
             return
 
         if self.datlist is not None:
             # Read from an internal dat list
-            for machine_attrs in self.datlist:
-                machine = Machine.from_dict(self, machine_attrs)
-                yield machine
+            yield from self.datlist
+        elif self.dat_cache:
+            # Read from a cached copy of the external dat file
+            dat_cache = DATCache(self.dat.target_path.path, {
+                'resources': sorted(self.enabled_resource_templates.keys()),
+                'rom_id_type': self.system.rom_id_type,
+            })
+
+            if dat_cache.is_valid():
+                yield from dat_cache.load()
+            else:
+                yield from dat_cache.save(self._index_ids(self._parse_dat()))
         else:
             # Read from an external dat file
-            doc = lxml.etree.iterparse(str(self.dat.target_path.path), tag=('game', 'machine'))
-            for event, element in doc:
-                if Machine.is_installable(element):
-                    machine = Machine.from_xml(self, element)
-                    yield machine
-                else:
-                    logging.debug(f"[{element.get('name')}] Ignored (not installable)")
-                
-                element.clear()
+            yield from self._parse_dat()
+
+    # Adds the unique id of each machine to the given attributes so that it can
+    # be persisted and reused without having to re-hash the machine's roms
+    def _index_ids(self, machine_attrs: Iterable[dict]) -> Generator[None, dict, None]:
+        for attrs in machine_attrs:
+            attrs['id'] = Machine.id_from_attrs(self, attrs)
+            yield attrs
+
+    # Parses the machine attributes from the external dat file.  If multiple workers
+    # have been configured, the dat is split into chunks which are parsed in parallel
+    # across processes (the results are still generated in document order).
+    def _parse_dat(self) -> Generator[None, dict, None]:
+        if self.dat_workers > 1:
+            yield from self._parse_dat_chunks()
+        else:
+            yield from self._parse_dat_xml(str(self.dat.target_path.path))
+
+    # Parses the machine attributes from the external dat file in parallel
+    def _parse_dat_chunks(self) -> Generator[None, dict, None]:
+        # Use more chunks than workers to limit how many parsed machines are held in
+        # memory at once
+        byte_ranges = self._dat_splitter().split(self.dat_workers * self.DAT_CHUNKS_PER_WORKER)
+
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            max_workers=self.dat_workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker,
+            initargs=(self,),
+        ) as executor:
+            for chunk_machine_attrs in executor.map(_parse_dat_chunk, byte_ranges):
+                yield from chunk_machine_attrs
+
+    # Builds a splitter for breaking up the external dat file into chunks
+    def _dat_splitter(self) -> DATSplitter:
+        return DATSplitter(self.dat.target_path.path)
+
+    # Parses the machine attributes from the given dat content (either a path or
+    # the raw bytes)
+    def _parse_dat_xml(self, source: Union[str, bytes]) -> Generator[None, dict, None]:
+        import lxml.etree
+
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+
+        doc = lxml.etree.iterparse(source, tag=('game', 'machine'))
+        for event, element in doc:
+            if Machine.is_installable(element):
+                yield Machine.attrs_from_xml(self, element)
+            elif tracer.enabled:
+                tracer.machine(element.get('name'), 'Ignored', 'not installable')
+
+            element.clear()
 
     # Applies the given set of filters against this romset's list of machines.
     # 
     # This returns the machines that passed the filters and the reason why
     # the filter applied.
     def filter_machines(self, filters: Ruleset, metadata: Metadata) -> Dict[Machine, FilterReason]:
+        results, possible_dependencies = self._filter_machines(filters, metadata)
+        try:
+            dependent_machines = self._resolve_dependencies(results, possible_dependencies)
+        finally:
+            possible_dependencies.close()
+
+        self._compact_rom_table(dependent_machines)
+
+        return results
+
+    # Applies the given set of filters against this romset's list of machines,
+    # generating the attributes of each machine that's needed (either because it
+    # passed the filters or because it's a dependency).
+    # 
+    # Unlike `filter_machines`, the result only consists of basic types so that it
+    # can be shared between processes.  Machines can be rebuilt from the result via
+    # `load_filtered_machine_attrs`.
+    def filter_machine_attrs(self, filters: Ruleset, metadata: Metadata) -> List[Tuple[dict, Optional[RuleMatchReason]]]:
+        machine_attrs = {}
+        results, possible_dependencies = self._filter_machines(filters, metadata, machine_attrs)
+        try:
+            dependent_machines = self._resolve_dependencies(results, possible_dependencies)
+        finally:
+            possible_dependencies.close()
+
+        # Include every machine that's been linked to
+        linked_machines = set(dependent_machines)
+        for machine in dependent_machines:
+            linked_machines.update(machine.dependent_machines.values())
+
+        filtered_machine_attrs = [(machine_attrs[machine.name], match_reason) for machine, match_reason in results.items()]
+        for machine in linked_machines:
+            if machine not in results:
+                filtered_machine_attrs.append((machine_attrs[machine.name], None))
+
+        return filtered_machine_attrs
+
+    # Rebuilds the machines generated by `filter_machine_attrs`, returning the same
+    # result as `filter_machines`
+    def load_filtered_machine_attrs(self, filtered_machine_attrs: List[Tuple[dict, Optional[RuleMatchReason]]], metadata: Metadata) -> Dict[Machine, FilterReason]:
         results = {}
-        possible_dependencies = {}
+        possible_dependencies = MachineStore(self, metadata)
 
-        for machine in self.iter_machines():
-            # Update based on metadata database
+        # Every machine is needed, so a fresh table is all that's required
+        self._rom_table = None
+
+        for machine_attrs, match_reason in filtered_machine_attrs:
+            machine = Machine.from_dict(self, machine_attrs)
             metadata.update(machine)
 
-            if self.filters and not self.filters.match(machine):
+            possible_dependencies.track(machine)
+            if match_reason:
+                results[machine] = match_reason
+
+        self._resolve_dependencies(results, possible_dependencies)
+
+        return results
+
+    # Finds the machines that pass the filters along with those that could be
+    # needed as dependencies.  If provided, the attributes of each of those machines
+    # will be tracked in `machine_attrs`.
+    def _filter_machines(self,
+        filters: Ruleset,
+        metadata: Metadata,
+        machine_attrs: Optional[Dict[str, dict]] = None,
+    ) -> Tuple[Dict[Machine, FilterReason], MachineStore]:
+        results = {}
+        possible_dependencies = MachineStore(self, metadata)
+
+        # Start with a fresh table so that ROMs from previous runs aren't retained
+        self._rom_table = None
+
+        try:
+            self._filter_machine_candidates(filters, metadata, results, possible_dependencies, machine_attrs)
+        except Exception:
+            possible_dependencies.close()
+            raise
+
+        return results, possible_dependencies
+
+    # Filters each machine in the dat, tracking those that pass the filters in
+    # `results` and those that may be needed as dependencies in `possible_dependencies`
+    def _filter_machine_candidates(self,
+        filters: Ruleset,
+        metadata: Metadata,
+        results: Dict[Machine, FilterReason],
+        possible_dependencies: MachineStore,
+        machine_attrs: Optional[Dict[str, dict]] = None,
+    ) -> None:
+        # Machines are either matched one at a time or in batches (see `_match_all`)
+        if self.system.filter_engine == 'bitset':
+            batch_size = self.FILTER_BATCH_SIZE
+        else:
+            batch_size = 1
+
+        batch = []
+        for attrs in self.iter_machine_attrs():
+            # Build the machine without loading files so that we can reject it based on
+            # its DAT definition alone
+            machine = Machine.from_dict(self, attrs, files=False)
+
+            if self.filters and not self.filters.prefilter(machine):
+                continue
+
+            # Machines rejected by the filters are only tracked if they may be needed as a
+            # dependency for another machine (i.e. parent/bios/device machines)
+            allowed = filters.prefilter(machine)
+            if not allowed and machine.is_clone and machine.runnable:
                 continue
 
-            match_reason = filters.match(machine)
+            # Update based on metadata database.  Files aren't loaded until we know
+            # whether the machine is being kept (see `_filter_machine_batch`).
+            metadata.update(machine)
+
+            batch.append((machine, attrs, allowed))
+            if len(batch) >= batch_size:
+                self._filter_machine_batch(batch, filters, results, possible_dependencies, machine_attrs)
+                batch = []
+
+        if batch:
+            self._filter_machine_batch(batch, filters, results, possible_dependencies, machine_attrs)
+
+    # Filters a batch of machines that have passed the prefilters, in the order
+    # they're defined
+    def _filter_machine_batch(self,
+        batch: List[Tuple[Machine, dict, bool]],
+        filters: Ruleset,
+        results: Dict[Machine, FilterReason],
+        possible_dependencies: MachineStore,
+        machine_attrs: Optional[Dict[str, dict]] = None,
+    ) -> None:
+        if self.filters:
+            romset_match_reasons = self._match_all(self.filters, [machine for machine, _, _ in batch])
+            batch = [candidate for candidate, match_reason in zip(batch, romset_match_reasons) if match_reason]
+
+        # Only allowed machines need to be checked against the system's filters
+        match_reasons = iter(self._match_all(filters, [machine for machine, _, allowed in batch if allowed]))
+
+        for machine, attrs, allowed in batch:
+            match_reason = allowed and next(match_reasons)
             if match_reason:
-                possible_dependencies[machine.name] = machine
+                machine.load_files(attrs)
+                possible_dependencies.track(machine)
                 results[machine] = match_reason
             elif not machine.is_clone or not machine.runnable:
                 # We track all parent/bios/device machines in case they're needed as a dependency
                 # in future machines.
-                possible_dependencies[machine.name] = machine
+                possible_dependencies.add(machine, attrs)
+            else:
+                continue
+
+            if machine_attrs is not None:
+                machine_attrs[machine.name] = attrs
+
+    # Matches the given machines against the ruleset using the system's filter engine
+    def _match_all(self, ruleset: Ruleset, machines: List[Machine]) -> List[Optional[RuleMatchReason]]:
+        if self.system.filter_engine == 'bitset':
+            return ruleset.match_all(machines)
+        else:
+            return [ruleset.match(machine) for machine in machines]
 
+    # Links the filtered machines to the machines they depend on, returning the
+    # full set of machines that are needed (filtered machines + dependencies)
+    def _resolve_dependencies(self, results: Dict[Machine, FilterReason], possible_dependencies: MachineStore) -> Set[Machine]:
         # All dependent machines (filtered machines + dependencies)
         dependent_machines = set(results.keys())
         for machine in dependent_machines.copy():
-            dependent_machines.update(slice_only(possible_dependencies, machine.dependent_machine_names).values())
+            dependent_machines.update(possible_dependencies.slice(machine.dependent_machine_names).values())
 
         # Set dependencies
         for machine in dependent_machines:
-            machine.dependent_machines.update(slice_only(possible_dependencies, machine.dependent_machine_names))
+            machine.link_dependencies(possible_dependencies.slice(machine.dependent_machine_names))
 
-        return results
+        return dependent_machines
+
+    # Rebuilds the ROM table so that it only contains the ROMs of the given machines
+    # and everything they're linked to.  This drops the ROMs of machines that were
+    # loaded while filtering, but ultimately weren't needed.
+    def _compact_rom_table(self, machines: Iterable[Machine]) -> None:
+        rom_table = self._build_rom_table()
+
+        moved = set()
+        pending = list(machines)
+        while pending:
+            machine = pending.pop()
+            if machine.name not in moved:
+                machine.move_roms(rom_table)
+                moved.add(machine.name)
+                pending.extend(machine.dependent_machines.values())
+
+        self._rom_table = rom_table
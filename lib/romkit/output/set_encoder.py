@@ -1,7 +1,10 @@
 import json
+from collections.abc import Mapping
 
 class SetEncoder(json.JSONEncoder):
     def default(self, obj):
-        if isinstance(obj, set):
+        if isinstance(obj, (set, frozenset)):
             return sorted(list(obj))
+        elif isinstance(obj, Mapping):
+            return dict(obj)
         return json.JSONEncoder.default(self, obj)
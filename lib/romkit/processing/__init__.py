@@ -1,3 +1,4 @@
+from romkit.processing.evaluation_context import EvaluationContext
 from romkit.processing.metadata import Metadata
 from romkit.processing.rule import Rule
 from romkit.processing.ruleset import Ruleset, RuleMatchReason
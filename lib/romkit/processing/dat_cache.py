@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Generator, Iterable, Optional
+
+# Provides a persistent, pre-parsed copy of the machines defined in a DAT file.
+#
+# The cache is stored next to the DAT and is keyed by the DAT's path, size,
+# modification time, and content hash along with any additional context that
+# affects how machines get parsed (e.g. the romset's enabled resources).  If any
+# of those change, the cache is ignored and rebuilt from the DAT.
+class DATCache:
+    # Version of the cache format.  This should be bumped whenever the structure
+    # of the persisted machine attributes changes.
+    VERSION = 2
+
+    # Size of the blocks to read when hashing the DAT
+    HASH_BLOCK_SIZE = 2 ** 20
+
+    def __init__(self, dat_path: Path, context: dict = {}) -> None:
+        self.dat_path = Path(dat_path)
+        self.path = self.dat_path.with_name(f'{self.dat_path.name}.cache')
+        self.context = context
+
+    # Builds the key that must match in order for the cache to be used
+    def _key(self, stat: os.stat_result, content_hash: Optional[str] = None) -> dict:
+        return {
+            'version': self.VERSION,
+            'path': str(self.dat_path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'sha1': content_hash,
+            'context': self.context,
+        }
+
+    # Generates a hash of the DAT's contents
+    def _hash(self) -> str:
+        content_hash = hashlib.sha1()
+        with self.dat_path.open('rb') as file:
+            for block in iter(lambda: file.read(self.HASH_BLOCK_SIZE), b''):
+                content_hash.update(block)
+
+        return content_hash.hexdigest()
+
+    # Whether the cache reflects the current state of the DAT
+    def is_valid(self) -> bool:
+        if not self.path.exists():
+            return False
+
+        try:
+            with self.path.open('rb') as file:
+                cached_key = pickle.load(file)
+        except Exception as e:
+            logging.debug(f'Failed to read DAT cache {self.path}: {e}')
+            return False
+
+        # Avoid hashing the file when the stat info has already changed
+        stat = self.dat_path.stat()
+        if cached_key != self._key(stat, cached_key.get('sha1')):
+            return False
+
+        return cached_key['sha1'] == self._hash()
+
+    # Iterates over the machine attributes stored in the cache
+    def load(self) -> Generator[None, dict, None]:
+        with self.path.open('rb') as file:
+            # Skip the key
+            pickle.load(file)
+
+            while True:
+                attrs = pickle.load(file)
+                if attrs is None:
+                    break
+
+                yield attrs
+
+    # Persists the given machine attributes to the cache while they're being
+    # iterated over.  The cache is only written if iteration completes.
+    def save(self, machine_attrs: Iterable[dict]) -> Generator[None, dict, None]:
+        key = self._key(self.dat_path.stat(), self._hash())
+
+        try:
+            tmp_file = tempfile.NamedTemporaryFile(dir=self.path.parent, prefix=f'.{self.path.name}', delete=False)
+        except OSError as e:
+            logging.debug(f'Unable to write DAT cache {self.path}: {e}')
+            yield from machine_attrs
+            return
+
+        tmp_path = Path(tmp_file.name)
+        try:
+            with tmp_file:
+                pickle.dump(key, tmp_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+                for attrs in machine_attrs:
+                    pickle.dump(attrs, tmp_file, protocol=pickle.HIGHEST_PROTOCOL)
+                    yield attrs
+
+                pickle.dump(None, tmp_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+            # Match the permissions of the dat rather than the restricted temp file
+            tmp_path.chmod(self.dat_path.stat().st_mode & 0o666)
+            tmp_path.rename(self.path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
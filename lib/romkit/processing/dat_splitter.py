@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
+
+# Splits a DAT file into byte ranges that can be parsed independently of each
+# other.  Each range starts at a top-level <machine> / <game> element and ends
+# where the next range starts, so every element is contained in exactly one
+# range.
+class DATSplitter:
+    # Start of an element that describes a machine
+    START_REGEX = re.compile(rb'<(?:machine|game)[\s>/]')
+
+    # End of an element that describes a machine
+    END_REGEX = re.compile(rb'</(?:machine|game)\s*>')
+
+    # XML declaration (e.g. for defining the encoding)
+    DECLARATION_REGEX = re.compile(rb'^\s*<\?xml[^>]*\?>')
+
+    # Size of the blocks to read when searching for element boundaries
+    BLOCK_SIZE = 2 ** 16
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+
+    # Generates up to `count` byte ranges of roughly equal size
+    def split(self, count: int) -> List[Tuple[int, int]]:
+        with self.path.open('rb') as file:
+            start = self._find_start(file, 0)
+            if start is None:
+                return []
+
+            end = self._find_end(file)
+            chunk_size = max((end - start) // count, 1)
+
+            # Find the element boundary closest to each target offset
+            offsets = [start]
+            for index in range(1, count):
+                offset = self._find_start(file, max(start + chunk_size * index, offsets[-1] + 1))
+                if offset is None or offset >= end:
+                    break
+
+                offsets.append(offset)
+
+            offsets.append(end)
+
+        return list(zip(offsets, offsets[1:]))
+
+    # Builds a standalone XML document containing the elements in the given range
+    def read(self, start: int, end: int) -> bytes:
+        with self.path.open('rb') as file:
+            declaration_match = self.DECLARATION_REGEX.match(file.read(self.BLOCK_SIZE))
+            declaration = declaration_match.group() if declaration_match else b''
+
+            file.seek(start)
+            content = file.read(end - start)
+
+        return b''.join([declaration, b'<datafile>', content, b'</datafile>'])
+
+    # Finds the offset of the first machine element at or after the given offset
+    def _find_start(self, file: BinaryIO, offset: int) -> Optional[int]:
+        file.seek(offset)
+
+        # Overlap blocks so that tags split across blocks are still found
+        overlap = b''
+        while True:
+            block = file.read(self.BLOCK_SIZE)
+            if not block:
+                return None
+
+            data = overlap + block
+            match = self.START_REGEX.search(data)
+            if match:
+                return offset - len(overlap) + match.start()
+
+            offset += len(block)
+            overlap = data[-16:]
+
+    # Finds the offset immediately after the last machine element in the file
+    def _find_end(self, file: BinaryIO) -> int:
+        size = self.path.stat().st_size
+        read_size = self.BLOCK_SIZE
+
+        while True:
+            offset = max(size - read_size, 0)
+            file.seek(offset)
+            data = file.read(size - offset)
+
+            last_match = None
+            for last_match in self.END_REGEX.finditer(data):
+                pass
+
+            if last_match:
+                return offset + last_match.end()
+            elif offset == 0:
+                return size
+
+            read_size *= 2
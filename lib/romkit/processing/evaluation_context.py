@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import logging
+from contextlib import contextmanager
+from typing import Dict, Generator, Optional
+
+# Tracks state that can be shared between rules while evaluating machines within
+# a single pass (e.g. loading or organizing a system).
+#
+# Multiple rulesets (filters, favorites, collections, directories, priorities)
+# often look up the same attribute on the same machine.  Within a pass, the
+# normalized values are cached per (machine, attribute, transform) so that
+# they're only looked up once.
+#
+# Rules are often repeated between rulesets as well (e.g. the same flags being
+# excluded in both the system's filters and a directory's filters).  Whether a
+# machine has a match is therefore also cached per (machine, rule signature).
+#
+# Values are stored on the machine itself so that they're released along with
+# the machine (e.g. when it gets filtered out).  Values stored by a previous
+# pass are ignored.
+class EvaluationContext:
+    # The context for the pass currently in progress (if any)
+    current: Optional[EvaluationContext] = None
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+        # Id assigned to each distinct rule signature seen in this pass.  Ids are
+        # small integers so that they're cheap to look up.
+        self.signature_ids: Dict[tuple, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.match_hits = 0
+        self.match_misses = 0
+
+    # Activates a new context for the duration of a pass
+    @classmethod
+    @contextmanager
+    def activate(cls, name: str) -> Generator[None, EvaluationContext, None]:
+        previous = cls.current
+        context = cls.current = cls(name)
+
+        try:
+            yield context
+        finally:
+            cls.current = previous
+            context.log_stats()
+
+    # Looks up the normalized values that the given rule evaluates for the
+    # machine, building them if they haven't been seen yet in this pass
+    def machine_values(self, machine: Machine, rule: Rule) -> set:
+        evaluated = machine._evaluated_values
+        if evaluated is None or evaluated[0] is not self:
+            evaluated = machine._evaluated_values = (self, {}, {})
+
+        values_by_key = evaluated[1]
+        key = rule.values_key
+        values = values_by_key.get(key)
+        if values is None:
+            self.misses += 1
+            values = values_by_key[key] = rule.build_machine_values(machine)
+        else:
+            self.hits += 1
+
+        return values
+
+    # Looks up whether the machine has a value matching the given rule, evaluating
+    # it if no rule with the same signature has been evaluated yet in this pass
+    def has_match(self, machine: Machine, rule: Rule) -> bool:
+        evaluated = machine._evaluated_values
+        if evaluated is None or evaluated[0] is not self:
+            evaluated = machine._evaluated_values = (self, {}, {})
+
+        matches_by_signature = evaluated[2]
+        signature_id = self.signature_id(rule)
+        matched = matches_by_signature.get(signature_id)
+        if matched is None:
+            self.match_misses += 1
+            matched = matches_by_signature[signature_id] = rule.evaluate_match(machine)
+        else:
+            self.match_hits += 1
+
+        return matched
+
+    # Looks up the id assigned to the given rule's signature in this pass
+    def signature_id(self, rule: Rule) -> int:
+        signature_id = rule._signature_id
+        if signature_id is None or signature_id[0] is not self:
+            signature_id = rule._signature_id = (self, self.signature_ids.setdefault(rule.signature, len(self.signature_ids)))
+
+        return signature_id[1]
+
+    # Logs how effective the caches were
+    def log_stats(self) -> None:
+        for cache_name, hits, misses in [('Attribute value', self.hits, self.misses), ('Rule match', self.match_hits, self.match_misses)]:
+            lookups = hits + misses
+            if lookups:
+                logging.debug(f'[{self.name}] {cache_name} cache: {hits} hits / {lookups} lookups ({hits / lookups:.1%})')
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from typing import Dict, Generator, Hashable, List, Tuple
+
+# Inverted index of the attribute values for a batch of machines.
+#
+# For each attribute (and transform) used by a rule, this maps every normalized
+# value to a bitset of the machines that have that value.  The bitsets are
+# plain integers where bit `n` represents the machine at index `n`.  This allows
+# a rule to be evaluated once for the entire batch: exact values become a union
+# of bitsets and patterns only need to be searched once per distinct value
+# rather than once per machine.  Ranges are evaluated by bisecting the sorted list
+# of distinct numeric values.
+#
+# Values are only indexed for the machines that a rule is being evaluated
+# against, so machines that have already been rejected by earlier rules aren't
+# looked up again.
+class MachineIndex:
+    def __init__(self, machines: List[Machine]) -> None:
+        self.machines = machines
+
+        # Bitset that includes every machine
+        self.all = (1 << len(machines)) - 1
+
+        # Rule values key -> value -> bitset
+        self._values: Dict[str, Dict[Hashable, int]] = {}
+
+        # Rule values key -> bitset of the machines that have been indexed
+        self._indexed: Dict[str, int] = {}
+
+        # Rule values key -> (sorted numeric values, bitset for each value)
+        self._numeric_values: Dict[str, Tuple[List[float], List[int]]] = {}
+
+    # Maps each value of the attribute evaluated by the given rule to the machines
+    # that have that value.  At least the given machines are indexed.
+    def values(self, rule: Rule, machines: int) -> Dict[Hashable, int]:
+        key = rule.values_key
+        values = self._values.setdefault(key, {})
+
+        indexed = self._indexed.get(key, 0)
+        missing = machines & ~indexed
+        if missing:
+            self._indexed[key] = indexed | missing
+            self._numeric_values.pop(key, None)
+
+            while missing:
+                bit = missing & -missing
+                for value in rule.machine_values(self.machines[bit.bit_length() - 1]):
+                    values[value] = values.get(value, 0) | bit
+                missing ^= bit
+
+        return values
+
+    # Bitset of the given machines that the rule matches (see `Rule.match`)
+    def match(self, rule: Rule, machines: int) -> int:
+        if rule.invert:
+            return machines & ~self.has_match(rule, machines)
+        else:
+            return self.has_match(rule, machines)
+
+    # Bitset of the given machines that have a value matching the rule (see
+    # `Rule.has_match`)
+    def has_match(self, rule: Rule, machines: int) -> int:
+        values = self.values(rule, machines)
+        bits = 0
+
+        # Exact values (looking up whichever side is smaller)
+        if len(rule.exact_values) < len(values):
+            for match_value in rule.exact_values:
+                bits |= values.get(match_value, 0)
+        else:
+            for value, value_bits in values.items():
+                if value in rule.exact_values:
+                    bits |= value_bits
+
+        # Patterns are only searched once per distinct value
+        if rule.pattern_values:
+            for value, value_bits in values.items():
+                if value and value_bits & machines & ~bits and rule.search_patterns(value):
+                    bits |= value_bits
+
+        # Ranges are a union of the bitsets for a slice of the sorted values
+        if rule.range_values:
+            numbers, numbers_bits = self.numeric_values(rule, machines)
+            for value_range in rule.range_values:
+                start, end = value_range.bisect(numbers)
+                for value_bits in numbers_bits[start:end]:
+                    bits |= value_bits
+
+        return bits & machines
+
+    # Sorts the numeric values of the attribute evaluated by the given rule.  This
+    # returns the list of values along with the bitset of machines for each value.
+    def numeric_values(self, rule: Rule, machines: int) -> Tuple[List[float], List[int]]:
+        values = self.values(rule, machines)
+
+        key = rule.values_key
+        numeric_values = self._numeric_values.get(key)
+        if numeric_values is None:
+            numbers = sorted(value for value in values if isinstance(value, (int, float)))
+            numeric_values = (numbers, [values[number] for number in numbers])
+            self._numeric_values[key] = numeric_values
+
+        return numeric_values
+
+    # Generates the machines in the given bitset (in index order)
+    def machines_in(self, bits: int) -> Generator[None, Machine, None]:
+        while bits:
+            lowest_bit = bits & -bits
+            yield self.machines[lowest_bit.bit_length() - 1]
+            bits ^= lowest_bit
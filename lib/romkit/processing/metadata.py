@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from romkit.models.machine import Machine
+from romkit.processing.metadata_cache import MetadataCache
+from romkit.processing.metadata_store import MetadataStore
 from romkit.util.dict_utils import slice_only
 
-import json
+import logging
 from enum import Enum
 from pathlib import Path
 
@@ -17,18 +19,36 @@ class Metadata:
     def __init__(self,
         attributes: List[BaseAttribute],
         defaults: dict = {},
+        # Whether to cache the resolved / indexed database between runs
+        cache: bool = True,
+        # Whether to only resolve metadata when it's first looked up
+        lazy: bool = False,
     ) -> None:
         self.attributes = [attr for attr in attributes if attr.metadata_name]
+        self.cache = cache
+        self.lazy = lazy
         self.defaults = {}
         self.data = {}
         self.mappings = {}
 
+        # Number of machines that were / weren't found when looking up metadata
+        self.hits = 0
+        self.misses = 0
+
+        # Metadata that hasn't been resolved yet (when lazy) along with the
+        # position of each key in the database
+        self._raw_data = {}
+        self._positions = {}
+
+        # Shared snapshot that unresolved metadata is being read from
+        self._store = None
+
         self.update_defaults(defaults)
 
     # Builds Metadata from the given json data
     @classmethod
     def from_json(cls, json: Dict[str, Any], attributes: List[BaseAttribute], **kwargs) -> Metadata:
-        metadata = cls(attributes=attributes, **slice_only(json, {'defaults'}), **kwargs)
+        metadata = cls(attributes=attributes, **slice_only(json, {'defaults', 'cache', 'lazy'}), **kwargs)
 
         path = json.get('path')
         if path:
@@ -36,10 +56,45 @@ class Metadata:
 
         return metadata
 
-    # Populate metadata based on the provided path
+    # Populate metadata based on the provided path.
+    # 
+    # If nothing else has been loaded yet, the indexed database is read from (or
+    # written to) the metadata cache.  When lazy, the cache only includes the
+    # index since metadata is resolved on demand.
     def load(self, path: Path) -> None:
-        with path.open() as file:
-            self.data.update(json.load(file))
+        lazy = self.lazy and not self.data and not self._raw_data
+        if not lazy:
+            # Lazy resolution only applies to the first database being loaded
+            self._resolve_all()
+
+        if not self.cache or self.data or self._raw_data:
+            self._load(path, lazy)
+            return
+
+        metadata_cache = MetadataCache(path, self.defaults, lazy)
+        if metadata_cache.is_valid():
+            if lazy:
+                self._raw_data, self.mappings = metadata_cache.load()
+                self._positions = {key: position for position, key in enumerate(self._raw_data)}
+            else:
+                self.data, self.mappings = metadata_cache.load()
+        else:
+            self._load(path, lazy)
+            metadata_cache.save(self._raw_data if lazy else self.data, self.mappings)
+
+    # Populate metadata based on the provided path, without caching.
+    # 
+    # The database is read from a snapshot shared with anything else in the process
+    # that has the same database open (see MetadataStore).  Snapshot entries are
+    # never modified -- resolved metadata is always stored in a new dict.
+    def _load(self, path: Path, lazy: bool = False) -> None:
+        store = MetadataStore.open(path)
+        if lazy:
+            self._store = store
+            self._raw_data = store.data
+            self._index_lazily()
+        else:
+            self.data.update(store.data)
             self.index()
 
     # Resolves dynamically generated metadata and creates an index to map
@@ -47,7 +102,44 @@ class Metadata:
     def index(self) -> None:
         for key in list(self.data.keys()):
             self._resolve_metadata(key)
-            self._create_mappings(key)
+            self._create_mappings(key, self.data[key].get('merge'))
+
+    # Creates an index to map various keys to their associated group name
+    # without resolving any metadata.  Metadata is instead resolved the first
+    # time it's looked up.
+    def _index_lazily(self) -> None:
+        self._positions = {key: position for position, key in enumerate(self._raw_data)}
+
+        # Merge keys can only be determined without resolving metadata if nothing
+        # modifies them (e.g. "merge|")
+        resolve_merge_keys = any(
+            self._is_merge_modifier(attr_name)
+            for metadata in [self.defaults, *self._raw_data.values()]
+            for attr_name in metadata
+        )
+
+        for key, metadata in self._raw_data.items():
+            if resolve_merge_keys:
+                merge_keys = self._resolve_lazily(key).get('merge')
+            elif 'group' in metadata:
+                merge_keys = metadata.get('merge')
+            else:
+                merge_keys = metadata.get('merge', self.defaults.get('merge'))
+
+            self._create_mappings(key, merge_keys)
+
+    # Whether the given attribute modifies the list of keys being merged
+    def _is_merge_modifier(self, attr_name: str) -> bool:
+        return attr_name.startswith('merge') and attr_name != 'merge'
+
+    # Resolves all metadata that has yet to be looked up
+    def _resolve_all(self) -> None:
+        for key in self._raw_data:
+            self._resolve_lazily(key)
+
+        self._raw_data = {}
+        self._positions = {}
+        self._store = None
 
     # Looks up the data associated with the given machine.  The following prioritizations
     # will be used when trying to look up the data:
@@ -63,17 +155,44 @@ class Metadata:
     # 
     # The first match will be returned.
     def get(self, machine: Machine) -> Dict[str, Any]:
-        for normalize in [False, True]:
-            for key in [machine.name, machine.parent_name, machine.parent_disc_title, machine.parent_title, machine.disc_title, machine.title]:
-                if not key:
-                    continue
+        mappings = self.mappings
+        keys = (machine.name, machine.parent_name, machine.parent_disc_title, machine.parent_title, machine.disc_title, machine.title)
 
-                if normalize:
-                    key = Machine.normalize(key)
+        for key in keys:
+            if key:
+                data_key = mappings.get(key)
+                if data_key:
+                    break
+        else:
+            # Only normalize keys if none of them match as-is
+            data_key = self._find_normalized_data_key(keys)
 
-                data_key = self.mappings.get(key)
+        if data_key:
+            self.hits += 1
+            return self.data.get(data_key) or self._resolve_lazily(data_key)
+        else:
+            self.misses += 1
+
+    # Finds the first metadata key mapped to by the normalized version of any of
+    # the given keys
+    def _find_normalized_data_key(self, keys: Tuple[Optional[str], ...]) -> Optional[str]:
+        mappings = self.mappings
+        for key in keys:
+            if key:
+                data_key = mappings.get(Machine.normalize(key))
                 if data_key:
-                    return self.data[data_key]
+                    return data_key
+
+    # Logs how effective lookups have been
+    def log_stats(self, name: str) -> None:
+        lookups = self.hits + self.misses
+        if lookups:
+            logging.debug(f'[{name}] Metadata: {self.hits} found / {lookups} lookups ({self.hits / lookups:.1%})')
+
+        normalize_info = Machine._normalize.cache_info()
+        normalize_lookups = normalize_info.hits + normalize_info.misses
+        if normalize_lookups:
+            logging.debug(f'[{name}] Normalize cache: {normalize_info.hits} hits / {normalize_lookups} lookups ({normalize_info.hits / normalize_lookups:.1%})')
 
     # Set defaults on the associated attributes
     def update_defaults(self, defaults: Dict[str, Any]) -> None:
@@ -100,10 +219,36 @@ class Metadata:
     # their base attribute name
     def _resolve_metadata(self, key: str) -> None:
         metadata = self.data[key]
+        group_metadata = self.data[metadata['group']] if 'group' in metadata else None
+        self.data[key] = self._merge_metadata(key, metadata, group_metadata)
 
+    # Resolves the metadata for the given key when it's first looked up
+    # 
+    # This produces the same result as resolving every key in order (see `index`):
+    # a group's metadata is only resolved before being merged in if the group
+    # precedes the given key.
+    def _resolve_lazily(self, key: str) -> Dict[str, Any]:
+        metadata = self.data.get(key)
+        if metadata is None:
+            metadata = self._raw_data[key]
+
+            group_metadata = None
+            if 'group' in metadata:
+                group_key = metadata['group']
+                if self._positions[group_key] < self._positions[key]:
+                    group_metadata = self._resolve_lazily(group_key)
+                else:
+                    group_metadata = self._raw_data[group_key]
+
+            metadata = self.data[key] = self._merge_metadata(key, metadata, group_metadata)
+
+        return metadata
+
+    # Merges the given metadata with the defaults and its group's metadata
+    def _merge_metadata(self, key: str, metadata: Dict[str, Any], group_metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         # Merge in parent meadata
-        if 'group' in metadata:
-            metadata = {**self.defaults, **self.data[metadata['group']], 'merge': [], **metadata}
+        if group_metadata is not None:
+            metadata = {**self.defaults, **group_metadata, 'merge': [], **metadata}
         else:
             metadata = {**self.defaults, **metadata, 'group': key}
 
@@ -129,17 +274,16 @@ class Metadata:
                 reference_attr_name = attr_name[0:replace_char_index]
                 metadata[reference_attr_name] = value_to_merge
 
-        self.data[key] = metadata
+        return metadata
 
     # Maps the given key to its associated metadata key and any other names/titles
     # being merged with it.
-    def _create_mappings(self, key: str) -> None:
+    def _create_mappings(self, key: str, merge_keys: Optional[List[str]]) -> None:
         self._create_mapping(key, key)
 
         # Add merge keys to map as well
-        metadata = self.data[key]
-        if 'merge' in metadata:
-            for merge_key in metadata['merge']:
+        if merge_keys:
+            for merge_key in merge_keys:
                 self._create_mapping(merge_key, key)
 
     # Maps the given key (a name or title) to a specific metadata key
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Provides a persistent, pre-indexed copy of a metadata database.
+#
+# Loading metadata requires parsing the JSON database, resolving every entry
+# (e.g. merging in groups / defaults), and normalizing every name that maps to
+# an entry.  The cache stores the result of all of that so that it only needs to
+# be unpickled on later runs.
+#
+# The cache is stored in the system's temp directory and is keyed by the
+# database's path, size, modification time, and content hash along with the
+# defaults that were merged into each entry.  If any of those change, the cache
+# is ignored and rebuilt from the database.
+#
+# When metadata is resolved lazily, the unresolved metadata is cached instead
+# (along with the index).
+class MetadataCache:
+    # Version of the cache format.  This should be bumped whenever the way in
+    # which metadata gets resolved / indexed changes.
+    VERSION = 1
+
+    # Size of the blocks to read when hashing the database
+    HASH_BLOCK_SIZE = 2 ** 20
+
+    def __init__(self, database_path: Path, defaults: dict = {}, lazy: bool = False) -> None:
+        self.database_path = Path(database_path).resolve()
+        self.defaults = defaults
+        self.lazy = lazy
+
+        path_hash = hashlib.sha1(str(self.database_path).encode()).hexdigest()[:16]
+        mode = '-lazy' if lazy else ''
+        self.path = Path(tempfile.gettempdir()).joinpath(f'romkit-metadata-{self.database_path.stem}-{path_hash}{mode}.cache')
+
+    # Builds the key that must match in order for the cache to be used
+    def _key(self, stat: os.stat_result, content_hash: Optional[str] = None) -> dict:
+        return {
+            'version': self.VERSION,
+            'path': str(self.database_path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'sha1': content_hash,
+            'defaults': self.defaults,
+            'lazy': self.lazy,
+        }
+
+    # Generates a hash of the database's contents
+    def _hash(self) -> str:
+        content_hash = hashlib.sha1()
+        with self.database_path.open('rb') as file:
+            for block in iter(lambda: file.read(self.HASH_BLOCK_SIZE), b''):
+                content_hash.update(block)
+
+        return content_hash.hexdigest()
+
+    # Whether the cache reflects the current state of the database
+    def is_valid(self) -> bool:
+        if not self.path.exists():
+            return False
+
+        try:
+            with self.path.open('rb') as file:
+                cached_key = pickle.load(file)
+        except Exception as e:
+            logging.debug(f'Failed to read metadata cache {self.path}: {e}')
+            return False
+
+        # Avoid hashing the file when the stat info has already changed
+        stat = self.database_path.stat()
+        if cached_key != self._key(stat, cached_key.get('sha1')):
+            return False
+
+        return cached_key['sha1'] == self._hash()
+
+    # Loads the (resolved) metadata and the mappings of names to metadata keys
+    def load(self) -> Tuple[Dict[str, dict], Dict[str, str]]:
+        with self.path.open('rb') as file:
+            # Skip the key
+            pickle.load(file)
+
+            return pickle.load(file)
+
+    # Persists the given (resolved) metadata / mappings
+    def save(self, data: Dict[str, dict], mappings: Dict[str, str]) -> None:
+        key = self._key(self.database_path.stat(), self._hash())
+
+        try:
+            tmp_file = tempfile.NamedTemporaryFile(dir=self.path.parent, prefix=f'.{self.path.name}', delete=False)
+        except OSError as e:
+            logging.debug(f'Unable to write metadata cache {self.path}: {e}')
+            return
+
+        tmp_path = Path(tmp_file.name)
+        try:
+            with tmp_file:
+                pickle.dump(key, tmp_file, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump((data, mappings), tmp_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+            tmp_path.rename(self.path)
+        except OSError as e:
+            logging.debug(f'Unable to write metadata cache {self.path}: {e}')
+        finally:
+            tmp_path.unlink(missing_ok=True)
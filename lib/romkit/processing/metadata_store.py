@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import copy
+import json
+import weakref
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+# Provides a read-only snapshot of a metadata database that's shared by everything
+# in the process reading the same file (e.g. romkit's Metadata and metakit's
+# Database).
+#
+# Snapshots are tracked by the database's path, size, and modification time.  They
+# are only kept around while something still references them, so that a single
+# romkit run doesn't hold onto the unresolved database once it's been indexed.
+#
+# Snapshot data must never be modified.  Changes should instead be made through
+# a MetadataOverlay.
+class MetadataStore:
+    _snapshots: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+    def __init__(self, path: Path, stat_key: Tuple[int, int], data: Dict[str, dict]) -> None:
+        self.path = path
+        self.stat_key = stat_key
+        self.data = data
+
+    # Opens a shared snapshot of the database at the given path, only parsing it
+    # if there's no snapshot reflecting the file's current state
+    @classmethod
+    def open(cls, path: Path) -> MetadataStore:
+        path = Path(path).resolve()
+        stat_key = cls._stat_key(path)
+
+        store = cls._snapshots.get(path)
+        if store is None or store.stat_key != stat_key:
+            with path.open() as file:
+                store = cls(path, stat_key, json.load(file))
+
+            cls._snapshots[path] = store
+
+        return store
+
+    # Builds the key used to determine whether a snapshot is stale
+    @staticmethod
+    def _stat_key(path: Path) -> Tuple[int, int]:
+        stat = path.stat()
+        return (stat.st_size, stat.st_mtime_ns)
+
+
+# Provides a writable view on top of a shared, read-only MetadataStore snapshot.
+#
+# Entries are copied out of the snapshot the first time they're accessed through
+# the mutable mapping interface since callers may modify them in place.  Entries
+# that are only being read can be accessed via `peek` / `peek_items` without
+# making a copy.
+class MetadataOverlay(MutableMapping):
+    def __init__(self, store: MetadataStore) -> None:
+        self.store = store
+
+        # Entries that have been copied from the snapshot or added
+        self.changes: Dict[str, dict] = {}
+
+        # Keys from the snapshot that have been removed
+        self.deleted: Set[str] = set()
+
+    # Looks up the given key without copying it out of the snapshot.  The result
+    # must not be modified.
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        if key in self.changes:
+            return self.changes[key]
+        elif key not in self.deleted:
+            return self.store.data.get(key)
+
+    # Iterates over all entries without copying them out of the snapshot.  The
+    # entries must not be modified.
+    def peek_items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for key in self:
+            yield key, self.peek(key)
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        metadata = self.changes.get(key)
+        if metadata is None:
+            if key in self.deleted or key not in self.store.data:
+                raise KeyError(key)
+
+            metadata = self.changes[key] = copy.deepcopy(self.store.data[key])
+
+        return metadata
+
+    def __setitem__(self, key: str, metadata: Dict[str, Any]) -> None:
+        self.changes[key] = metadata
+        self.deleted.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+
+        self.changes.pop(key, None)
+        if key in self.store.data:
+            self.deleted.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.changes or (key in self.store.data and key not in self.deleted)
+
+    # Snapshot keys are listed first (in their original order), followed by
+    # new keys
+    def __iter__(self) -> Iterator[str]:
+        for key in self.store.data:
+            if key not in self.deleted:
+                yield key
+
+        for key in self.changes:
+            if key not in self.store.data:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self.store.data) - len(self.deleted) + sum(1 for key in self.changes if key not in self.store.data)
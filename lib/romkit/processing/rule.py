@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+from romkit.processing.evaluation_context import EvaluationContext
+from romkit.processing.rule_range import RuleRange
+from romkit.processing.rule_stats import RuleStats
+from romkit.util.trace import tracer
+
 import logging
 import re
+import time
 from enum import Enum
-from typing import Any, Pattern
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
 
 class RuleLogicModifier(Enum):
     ALLOW = ''
@@ -40,6 +46,15 @@ class RuleTransform(Enum):
 
 # Provides a base class for reducing the set of machines to install
 class Rule:
+    # Patterns that can't be combined into a single alternation since they rely
+    # on their own group numbering / names (e.g. backreferences, conditionals)
+    GROUP_REFERENCE_REGEX = re.compile(r'\\[1-9]|\(\?P=|\(\?\(')
+
+    # Patterns that can't be combined into a single alternation since they set
+    # global inline flags (e.g. `(?i)`).  Depending on the Python version, these
+    # either fail to compile or apply to every pattern in the alternation.
+    INLINE_FLAGS_REGEX = re.compile(r'\(\?[aiLmsux]+\)')
+
     def __init__(self,
         id: str,
         attribute: BaseAttribute,
@@ -61,8 +76,32 @@ class Rule:
         self.values = []
         self.exact_values = set()
         self.pattern_values = set()
+        self.range_values = set()
+
+        # Identifies the machine values this rule evaluates so that they can be
+        # shared with other rules (see EvaluationContext)
+        self.values_key = f'{attribute.primary_name}.{transform.value}'
+
+        # Function for searching a value against all pattern values (see `search_patterns`)
+        self._pattern_searcher = None
+
+        # Canonical identity of the values being matched (see `signature`)
+        self._signature = None
+
+        # Id assigned to the signature by the evaluation context it was last used
+        # in, as a (context, id) tuple (see EvaluationContext)
+        self._signature_id = None
+
+        # Index of each value within `values` (see `first_match_index`)
+        self._value_indexes = None
+
+        # Runtime stats (see `track_stats`)
+        self.stats: Optional[RuleStats] = None
+
+        # Numeric values can be matched against ranges (e.g. >=1990)
+        numeric = transform == RuleTransform.LENGTH or attribute.data_type != str
 
-        # Normalize values and split based on exact/regex matches to optimize performance
+        # Normalize values and split based on exact/regex/range matches to optimize performance
         for match_value in attribute.normalize(values):
             target_values = self.exact_values
 
@@ -75,6 +114,12 @@ class Rule:
                     # Compile to regular expression
                     target_values = self.pattern_values
                     match_value = re.compile(match_value[1:])
+                elif numeric:
+                    # Parse numeric range, if applicable
+                    value_range = RuleRange.parse(match_value)
+                    if value_range:
+                        target_values = self.range_values
+                        match_value = value_range
 
             self.values.append(match_value)
             target_values.add(match_value)
@@ -128,34 +173,94 @@ class Rule:
 
         self.exact_values.update(rule.exact_values)
         self.pattern_values.update(rule.pattern_values)
+        self.range_values.update(rule.range_values)
+        self._pattern_searcher = None
+        self._signature = None
+        self._signature_id = None
+        self._value_indexes = None
+
+    # Canonical identity of what this rule matches against: the attribute values
+    # being evaluated along with the exact values / patterns they're compared to.
+    # Rules with the same signature always have the same `has_match` result,
+    # regardless of their id, order of values, or whether they're inverted.
+    @property
+    def signature(self) -> tuple:
+        if self._signature is None:
+            self._signature = (
+                self.values_key,
+                frozenset(self.exact_values),
+                frozenset(pattern.pattern for pattern in self.pattern_values),
+                frozenset(self.range_values),
+            )
+
+        return self._signature
+
+    # Starts tracking runtime stats, optionally starting from previously learned
+    # stats.  If tracking patterns, the time spent searching each pattern is
+    # tracked as well.
+    def track_stats(self, learned_stats: dict = {}, patterns: bool = False) -> None:
+        self.stats = RuleStats.from_json(learned_stats, pattern_time_ns=({} if patterns else None))
+
+    # Does this match the given machine?  Stats can be skipped when the machine
+    # will be matched against this rule again later (e.g. when prefiltering).
+    def match(self, machine: Machine, record_stats: bool = True) -> bool:
+        if self.stats is None or not record_stats:
+            matched = self._match(machine)
+        else:
+            start_time = time.perf_counter_ns()
+            matched = self._match(machine)
+            self.stats.record(matched, time.perf_counter_ns() - start_time)
+
+            if self.stats.pattern_time_ns is not None and self.pattern_values:
+                self.profile_patterns(machine)
+
+        if not matched and self.log and tracer.enabled:
+            tracer.machine(machine.name, 'Skip', self.id)
+
+        return matched
 
-    # Does this match the given machine?
-    def match(self, machine: Machine) -> bool:
+    # Does this match the given machine (without tracking stats)?
+    def _match(self, machine: Machine) -> bool:
         if self.invert:
-            matched = not self.has_match(machine)
+            return not self.has_match(machine)
         else:
-            matched = self.has_match(machine)
+            return self.has_match(machine)
 
-        if not matched and self.log:
-            logging.debug(f'[{machine.name}] Skip ({self.id})')
+    # Tracks the time spent searching each individual pattern against the machine
+    def profile_patterns(self, machine: Machine) -> None:
+        machine_values = [value for value in self.machine_values(machine) if value]
 
-        return matched
+        for pattern in self.pattern_values:
+            start_time = time.perf_counter_ns()
+            any(pattern.search(value) for value in machine_values)
+            self.stats.record_pattern(pattern.pattern, time.perf_counter_ns() - start_time)
 
     # Get the attribute value for the given machine
     def raw_machine_value(self, machine: Machine) -> Any:
         return self.transform.apply(self.attribute.get(machine))
 
-    # Get the attribute value for the given machine, wrapping (if necessary) in a Set
+    # Get the attribute value for the given machine, wrapping (if necessary) in a Set.
+    # 
+    # Values are shared with other rules for the same attribute / transform while
+    # an evaluation context is active.
     def machine_values(self, machine: Machine) -> set:
+        context = EvaluationContext.current
+        if context and not self.attribute.volatile:
+            return context.machine_values(machine, self)
+        else:
+            return self.build_machine_values(machine)
+
+    # Builds the normalized attribute values for the given machine
+    def build_machine_values(self, machine: Machine) -> set:
         # Transform machine value
         machine_value = self.raw_machine_value(machine)
         if self.transform.normalize:
             machine_value = self.attribute.normalize(machine_value)
 
         # Force to enumerable
-        if isinstance(machine_value, list):
+        if isinstance(machine_value, (list, tuple)):
             machine_values = set(machine_value)
-        elif isinstance(machine_value, set):
+        elif isinstance(machine_value, (set, frozenset)):
             machine_values = machine_value
         else:
             machine_values = {machine_value}
@@ -165,8 +270,21 @@ class Rule:
 
         return machine_values
 
-    # Whether there's a matching value in the given machine
-    def has_match(self, machine: Machine) -> set:
+    # Whether there's a matching value in the given machine.
+    # 
+    # Results are shared with other rules that have the same signature while an
+    # evaluation context is active.  This only applies to rules with patterns
+    # since exact values are already a single set lookup against the shared
+    # machine values.
+    def has_match(self, machine: Machine) -> bool:
+        context = EvaluationContext.current
+        if context and self.pattern_values and not self.attribute.volatile:
+            return context.has_match(machine, self)
+        else:
+            return self.evaluate_match(machine)
+
+    # Evaluates whether there's a matching value in the given machine
+    def evaluate_match(self, machine: Machine) -> bool:
         machine_values = self.machine_values(machine)
 
         if not self.exact_values.isdisjoint(machine_values):
@@ -175,11 +293,56 @@ class Rule:
         elif self.pattern_values:
             # Look for pattern
             for machine_value in machine_values:
-                if machine_value and any(pattern.search(machine_value) for pattern in self.pattern_values):
+                if machine_value and self.search_patterns(machine_value):
+                    return True
+
+        if self.range_values:
+            # Look for numeric range
+            for machine_value in machine_values:
+                if self.search_ranges(machine_value):
                     return True
 
         return False
 
+    # Whether the given value matches any of the pattern values
+    def search_patterns(self, value: str) -> bool:
+        if not self._pattern_searcher:
+            self._pattern_searcher = self._build_pattern_searcher()
+
+        return self._pattern_searcher(value)
+
+    # Whether the given value is within any of the range values
+    def search_ranges(self, value: Any) -> bool:
+        return any(value_range.includes(value) for value_range in self.range_values)
+
+    # Builds a function for searching against all pattern values in a single scan
+    # by combining them into one alternation.  If the patterns can't be combined,
+    # each pattern is searched individually.
+    def _build_pattern_searcher(self) -> Callable[[str], bool]:
+        patterns = sorted(self.pattern_values, key=lambda pattern: pattern.pattern)
+        if len(patterns) == 1:
+            return lambda value: patterns[0].search(value) is not None
+
+        # Patterns that have to be searched on their own
+        separate_patterns = [
+            pattern for pattern in patterns
+            if self.GROUP_REFERENCE_REGEX.search(pattern.pattern) or self.INLINE_FLAGS_REGEX.search(pattern.pattern)
+        ]
+        combinable_patterns = [pattern for pattern in patterns if pattern not in separate_patterns]
+
+        if len(combinable_patterns) > 1:
+            try:
+                combinable_patterns = [re.compile('|'.join(f'(?:{pattern.pattern})' for pattern in combinable_patterns))]
+            except re.error as e:
+                # For example, patterns with duplicate group names
+                logging.debug(f'Unable to combine patterns for {self.id}: {e}')
+
+        patterns = combinable_patterns + separate_patterns
+        if len(patterns) == 1:
+            return lambda value: patterns[0].search(value) is not None
+
+        return lambda value: any(pattern.search(value) for pattern in patterns)
+
     # Finds all matching values in the machine
     def find_matches(self, machine: Machine) -> set:
         machine_values = self.machine_values(machine)
@@ -190,7 +353,12 @@ class Rule:
 
         if self.pattern_values:
             for machine_value in machine_values:
-                if machine_value and any(pattern.search(machine_value) for pattern in self.pattern_values):
+                if machine_value and self.search_patterns(machine_value):
+                    matches.add(machine_value)
+
+        if self.range_values:
+            for machine_value in machine_values:
+                if self.search_ranges(machine_value):
                     matches.add(machine_value)
 
         return matches
@@ -206,20 +374,59 @@ class Rule:
     # the sorter setting.
     def first_match_index(self, machine: Machine) -> Any:
         machine_values = self.machine_values(machine)
+        if self._value_indexes is None:
+            self._value_indexes = self._build_value_indexes()
+        exact_indexes, pattern_indexes, range_indexes = self._value_indexes
 
-        for index, match_value in enumerate(self.values):
-            for machine_value in machine_values:
-                if isinstance(match_value, Pattern):
-                    if machine_value is not None and match_value.search(machine_value):
-                        # Found pattern match
-                        return index
+        # Default index is lowest
+        first_index = len(self.values)
+
+        # Find exact matches
+        for machine_value in machine_values:
+            index = exact_indexes.get(machine_value, first_index)
+            if index < first_index:
+                first_index = index
+
+        # Find range matches
+        for index, value_range in range_indexes:
+            if index >= first_index:
+                break
+
+            if any(value_range.includes(machine_value) for machine_value in machine_values):
+                first_index = index
+                break
+
+        # Find pattern matches, only searching patterns individually if at least
+        # one of them matches
+        if pattern_indexes:
+            machine_values = [machine_value for machine_value in machine_values if machine_value is not None]
+            if any(self.search_patterns(machine_value) for machine_value in machine_values):
+                for index, pattern in pattern_indexes:
+                    if index >= first_index:
                         break
-                elif machine_value == match_value:
-                    # Found exact match
-                    return index
 
-        # Default index is lowest
-        return len(self.values)
+                    if any(pattern.search(machine_value) for machine_value in machine_values):
+                        first_index = index
+                        break
+
+        return first_index
+
+    # Maps exact values to their (first) index within `values` and lists the
+    # patterns / ranges along with their index, in order
+    def _build_value_indexes(self) -> Tuple[Dict[Any, int], List[Tuple[int, Pattern]], List[Tuple[int, RuleRange]]]:
+        exact_indexes = {}
+        pattern_indexes = []
+        range_indexes = []
+
+        for index, match_value in enumerate(self.values):
+            if isinstance(match_value, Pattern):
+                pattern_indexes.append((index, match_value))
+            elif isinstance(match_value, RuleRange):
+                range_indexes.append((index, match_value))
+            else:
+                exact_indexes.setdefault(match_value, index)
+
+        return exact_indexes, pattern_indexes, range_indexes
 
     # Equality based on ID
     def __eq__(self, other) -> bool:
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import Any, List, Optional, Tuple
+
+# Represents a numeric range that values can be compared against, e.g.:
+#
+# * `>=1990`, `>1990`, `<=1995`, `<1995`
+# * `1985..1995` (inclusive on both ends)
+# * `1990..` / `..1995` (unbounded on one end)
+class RuleRange:
+    NUMBER = r'-?[0-9]+(?:\.[0-9]+)?'
+    COMPARISON_REGEX = re.compile(rf'^(>=|<=|>|<)\s*({NUMBER})$')
+    BETWEEN_REGEX = re.compile(rf'^({NUMBER})?\.\.({NUMBER})?$')
+
+    def __init__(self,
+        minimum: Optional[float] = None,
+        maximum: Optional[float] = None,
+        include_minimum: bool = True,
+        include_maximum: bool = True,
+    ) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.include_minimum = include_minimum
+        self.include_maximum = include_maximum
+
+    # Builds a range from the given expression, or None if the expression isn't
+    # a range
+    @classmethod
+    def parse(cls, expression: str) -> Optional[RuleRange]:
+        expression = expression.strip()
+
+        comparison_match = cls.COMPARISON_REGEX.match(expression)
+        if comparison_match:
+            operator, number = comparison_match.groups()
+            number = cls._to_number(number)
+
+            if operator[0] == '>':
+                return cls(minimum=number, include_minimum=(operator == '>='))
+            else:
+                return cls(maximum=number, include_maximum=(operator == '<='))
+
+        between_match = cls.BETWEEN_REGEX.match(expression)
+        if between_match and any(between_match.groups()):
+            minimum, maximum = between_match.groups()
+            return cls(
+                minimum=(cls._to_number(minimum) if minimum else None),
+                maximum=(cls._to_number(maximum) if maximum else None),
+            )
+
+    # Converts the given string to an int / float
+    @staticmethod
+    def _to_number(value: str) -> float:
+        if '.' in value:
+            return float(value)
+        else:
+            return int(value)
+
+    # Whether the given value is within this range.  Non-numeric values are never
+    # included.
+    def includes(self, value: Any) -> bool:
+        if not isinstance(value, (int, float)):
+            return False
+
+        if self.minimum is not None:
+            if value < self.minimum or (value == self.minimum and not self.include_minimum):
+                return False
+
+        if self.maximum is not None:
+            if value > self.maximum or (value == self.maximum and not self.include_maximum):
+                return False
+
+        return True
+
+    # Finds the [start, end) positions of the values included in this range from
+    # the given sorted list of numbers
+    def bisect(self, values: List[float]) -> Tuple[int, int]:
+        if self.minimum is None:
+            start = 0
+        elif self.include_minimum:
+            start = bisect_left(values, self.minimum)
+        else:
+            start = bisect_right(values, self.minimum)
+
+        if self.maximum is None:
+            end = len(values)
+        elif self.include_maximum:
+            end = bisect_right(values, self.maximum)
+        else:
+            end = bisect_left(values, self.maximum)
+
+        return start, end
+
+    def _key(self) -> tuple:
+        return (self.minimum, self.maximum, self.include_minimum, self.include_maximum)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, RuleRange):
+            return self._key() == other._key()
+        return False
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    # Object description
+    def __str__(self) -> str:
+        if self.minimum is not None and self.maximum is not None and self.include_minimum and self.include_maximum:
+            return f'{self.minimum}..{self.maximum}'
+
+        conditions = []
+        if self.minimum is not None:
+            conditions.append(f"{'>=' if self.include_minimum else '>'}{self.minimum}")
+        if self.maximum is not None:
+            conditions.append(f"{'<=' if self.include_maximum else '<'}{self.maximum}")
+
+        return ','.join(conditions)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from romkit.util.dict_utils import slice_only
+
+from typing import Dict, List, Optional, Tuple
+
+# Tracks how a rule performs at runtime: how often it's evaluated, how often it
+# rejects a machine, and how long it takes.  This is used to determine which
+# rules should be evaluated first and for profiling rulesets.
+class RuleStats:
+    # Number of patterns to include in profiles
+    TOP_PATTERNS = 5
+
+    def __init__(self,
+        evaluations: int = 0,
+        rejections: int = 0,
+        time_ns: int = 0,
+        # Time spent searching each pattern (pattern -> time), if tracked
+        pattern_time_ns: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.evaluations = evaluations
+        self.rejections = rejections
+        self.time_ns = time_ns
+        self.pattern_time_ns = pattern_time_ns
+
+    # Builds RuleStats from the given json data
+    @classmethod
+    def from_json(cls, json: dict, **kwargs) -> RuleStats:
+        return cls(**slice_only(json, {'evaluations', 'rejections', 'time_ns'}), **kwargs)
+
+    # Number of times the rule matched
+    @property
+    def matches(self) -> int:
+        return self.evaluations - self.rejections
+
+    # Records the result of evaluating the rule against a machine
+    def record(self, matched: bool, time_ns: int) -> None:
+        self.evaluations += 1
+        self.time_ns += time_ns
+        if not matched:
+            self.rejections += 1
+
+    # Records the result of evaluating the rule against multiple machines at once
+    def record_all(self, evaluations: int, rejections: int, time_ns: int) -> None:
+        self.evaluations += evaluations
+        self.rejections += rejections
+        self.time_ns += time_ns
+
+    # Records the time spent searching the given pattern
+    def record_pattern(self, pattern: str, time_ns: int) -> None:
+        self.pattern_time_ns[pattern] = self.pattern_time_ns.get(pattern, 0) + time_ns
+
+    # Expected time spent per machine rejected.  Rules that are both cheap and
+    # highly selective have the lowest score.
+    #
+    # Rules that haven't been evaluated yet are scored lowest so that they're
+    # tried early on, while rules that never reject anything are scored highest.
+    @property
+    def score(self) -> float:
+        if not self.evaluations:
+            return 0
+        elif not self.rejections:
+            return float('inf')
+        else:
+            return self.time_ns / self.rejections
+
+    # Patterns that took the longest to search, along with the time spent (ns)
+    def top_patterns(self, count: int = TOP_PATTERNS) -> List[Tuple[str, int]]:
+        if not self.pattern_time_ns:
+            return []
+
+        return sorted(self.pattern_time_ns.items(), key=lambda item: item[1], reverse=True)[:count]
+
+    # Human / machine-readable summary of the stats
+    def profile(self) -> dict:
+        profile = {
+            'evaluations': self.evaluations,
+            'matches': self.matches,
+            'rejections': self.rejections,
+            'time_ms': round(self.time_ns / 1e6, 3),
+        }
+
+        if self.pattern_time_ns:
+            profile['patterns'] = [
+                {'pattern': pattern, 'time_ms': round(time_ns / 1e6, 3)}
+                for pattern, time_ns in self.top_patterns()
+            ]
+
+        return profile
+
+    def to_json(self) -> dict:
+        return {
+            'evaluations': self.evaluations,
+            'rejections': self.rejections,
+            'time_ns': self.time_ns,
+        }
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+from romkit.processing.machine_index import MachineIndex
 from romkit.processing.rule import Rule
+from romkit.util.trace import tracer
 
+import time
 from enum import Enum
+from typing import Callable, Dict, Hashable, List, Optional, Set
 
 class RuleMatchReason(Enum):
     ALLOW = 1
@@ -15,15 +19,30 @@ class Ruleset:
     ENABLED_KEY = 'enabled'
     RESERVED_KEYS = {ENABLED_KEY}
 
+    # Number of machines to evaluate between reordering rules (when tracking stats)
+    REORDER_INTERVAL = 256
+
+    # Number of machines to evaluate together when determining memberships
+    MEMBERSHIP_BATCH_SIZE = 1024
+
     def __init__(self,
         default_on_empty: Optional[RuleMatchReason] = RuleMatchReason.ALLOW,
         log: bool = True,
     ) -> None:
         self.rules = []
         self.overrides = []
+        self.prefilter_rules = []
         self.default_on_empty = default_on_empty
         self.log = log
 
+        # Runtime stats (see `track_stats`).  When adaptive, rules are ordered by
+        # how cheap / selective they've been.
+        self.tracking_stats = False
+        self.tracking_patterns = False
+        self.adaptive = False
+        self.evaluations = 0
+        self.matches = 0
+
     # Builds a Ruleset from the given json data
     @classmethod
     def from_json(cls, json: dict, attributes: List[BaseAttribute], **kwargs) -> FilterSet:
@@ -62,10 +81,29 @@ class Ruleset:
         else:
             self.rules.append(rule)
 
+        if self.tracking_stats and rule.stats is None:
+            rule.track_stats(patterns=self.tracking_patterns)
+
         self._optimize()
 
     # Whether the given machine matches
     def match(self, machine: Machine) -> Optional[RuleMatchReason]:
+        if not self.tracking_stats:
+            return self._match(machine)
+
+        match_reason = self._match(machine)
+        self.evaluations += 1
+        if match_reason:
+            self.matches += 1
+
+        # Periodically adapt the order based on what's been learned so far
+        if self.adaptive and self.evaluations % self.REORDER_INTERVAL == 0:
+            self._optimize()
+
+        return match_reason
+
+    # Whether the given machine matches (without tracking stats)
+    def _match(self, machine: Machine) -> Optional[RuleMatchReason]:
         if not self.overrides and not self.rules:
             return self.default_on_empty
 
@@ -93,8 +131,204 @@ class Ruleset:
                 # all rules agreed that this machine is allowed
                 return RuleMatchReason.ALLOW
 
+    # Starts tracking runtime stats for each rule.
+    # 
+    # If adaptive, rules are ordered so that those that are cheapest / most
+    # selective are evaluated first.  Previously learned stats (see `dump_stats`)
+    # can be provided to determine the initial order.
+    # 
+    # If tracking patterns, the time spent searching each of a rule's patterns is
+    # tracked as well (at the cost of searching them individually).
+    def track_stats(self, learned_stats: Dict[str, dict] = {}, adaptive: bool = False, patterns: bool = False) -> None:
+        self.tracking_stats = True
+        self.tracking_patterns = patterns
+        self.adaptive = adaptive
+        self.evaluations = 0
+        self.matches = 0
+
+        for rule in self.rules + self.overrides:
+            rule.track_stats(learned_stats.get(rule.id, {}), patterns=patterns)
+
+        self._optimize()
+
+    # Generates the stats learned for each rule
+    def dump_stats(self) -> Dict[str, dict]:
+        return {rule.id: rule.stats.to_json() for rule in self.rules + self.overrides}
+
+    # Summarizes the stats tracked for this ruleset and each of its rules
+    def profile(self) -> dict:
+        rules = self.overrides + self.rules
+
+        return {
+            'evaluations': self.evaluations,
+            'matches': self.matches,
+            'time_ms': round(sum(rule.stats.time_ns for rule in rules) / 1e6, 3),
+            'rules': {rule.id: rule.stats.profile() for rule in rules},
+        }
+
+    # Whether each of the given machines match, evaluating each rule once across
+    # all of the machines rather than once per machine.
+    # 
+    # This produces the same results as calling `match` on each machine.  An
+    # existing index of the machines can be provided in order to share the values
+    # looked up with other rulesets.
+    def match_all(self, machines: List[Machine], index: Optional[MachineIndex] = None) -> List[Optional[RuleMatchReason]]:
+        if not self.overrides and not self.rules:
+            return [self.default_on_empty] * len(machines)
+
+        if index is None:
+            index = MachineIndex(machines)
+
+        # Track which machines were matched by an override and whether that was by
+        # explicit name.  Machines stop being checked against overrides once
+        # they've been matched by name.
+        matched_by_override = 0
+        matched_by_name_override = 0
+        pending = index.all
+        for rule in self.overrides:
+            matched = self._match_index(index, rule, pending)
+            self._log_skipped(rule, index, pending & ~matched)
+
+            matched_by_override |= matched
+            if rule.attribute_name == 'names':
+                matched_by_name_override |= matched
+                pending &= ~matched
+
+        # Some rules apply even if an override is matched (e.g. emulation compatibility)
+        matched = index.all
+        for rule in self.rules:
+            if not matched:
+                break
+
+            if rule.attribute.apply_to_overrides:
+                checked = matched
+            else:
+                checked = matched & ~matched_by_override
+
+            skipped = checked & ~self._match_index(index, rule, checked)
+            self._log_skipped(rule, index, skipped)
+            matched &= ~skipped
+
+        results = [None] * len(machines)
+        for bit_index in range(len(machines)):
+            bit = 1 << bit_index
+            if matched & bit:
+                if matched_by_name_override & bit:
+                    # Only explicit names will override everything else
+                    results[bit_index] = RuleMatchReason.OVERRIDE
+                else:
+                    results[bit_index] = RuleMatchReason.ALLOW
+
+        if self.tracking_stats:
+            self.evaluations += len(machines)
+            self.matches += bin(matched).count('1')
+
+        return results
+
+    # Determines which of the given machines match each of the given rulesets
+    # (identified by key) using the given filter engine ("machine" or "bitset").
+    # 
+    # With the bitset engine, all of the rulesets are evaluated together in batches
+    # of machines so that attribute values are only looked up once per machine,
+    # regardless of how many rulesets reference them.  Note that this means that
+    # rulesets can't depend on changes made as a result of other rulesets in the
+    # same call.
+    @classmethod
+    def memberships(cls, rulesets: Dict[Hashable, Ruleset], machines: List[Machine], engine: str = 'machine') -> Dict[Hashable, Set[Machine]]:
+        if engine != 'bitset':
+            return {
+                key: {machine for machine in machines if ruleset.match(machine) is not None}
+                for key, ruleset in rulesets.items()
+            }
+
+        memberships = {key: set() for key in rulesets}
+
+        for start in range(0, len(machines), cls.MEMBERSHIP_BATCH_SIZE):
+            batch = machines[start:start + cls.MEMBERSHIP_BATCH_SIZE]
+            index = MachineIndex(batch)
+
+            for key, ruleset in rulesets.items():
+                members = memberships[key]
+                for machine, match_reason in zip(batch, ruleset.match_all(batch, index)):
+                    if match_reason is not None:
+                        members.add(machine)
+
+        return memberships
+
+    # Bitset of the given machines in the index that the rule matches
+    def _match_index(self, index: MachineIndex, rule: Rule, machines: int) -> int:
+        if not self.tracking_stats:
+            return index.match(rule, machines)
+
+        start_time = time.perf_counter_ns()
+        matched = index.match(rule, machines)
+        rule.stats.record_all(bin(machines).count('1'), bin(machines & ~matched).count('1'), time.perf_counter_ns() - start_time)
+
+        if rule.stats.pattern_time_ns is not None and rule.pattern_values:
+            for machine in index.machines_in(machines):
+                rule.profile_patterns(machine)
+
+        return matched
+
+    # Logs the machines that were skipped by the given rule
+    def _log_skipped(self, rule: Rule, index: MachineIndex, skipped: int) -> None:
+        if rule.log and skipped and tracer.enabled:
+            for machine in index.machines_in(skipped):
+                tracer.machine(machine.name, 'Skip', rule.id)
+
+    # Whether the given machine could match based only on the rules that can be
+    # evaluated from the machine's DAT definition.  This allows machines to be
+    # rejected before metadata / files are loaded for them.
+    #
+    # Note that this is *not* a replacement for `match`.  A machine that passes the
+    # prefilter may still fail to match once metadata has been loaded.
+    #
+    # Rule stats are only recorded for machines that are rejected here.  Machines
+    # that pass are evaluated (and recorded) again by `match`, so each machine is
+    # only counted once per rule.
+    def prefilter(self, machine: Machine) -> bool:
+        if not self.prefilter_rules:
+            return True
+
+        if not self.tracking_stats:
+            return self._prefilter(machine, lambda rule: rule.match(machine, record_stats=False))
+
+        # Track the results so that they can be recorded if the machine is rejected
+        evaluated = []
+        def match(rule: Rule) -> bool:
+            start_time = time.perf_counter_ns()
+            matched = rule.match(machine, record_stats=False)
+            evaluated.append((rule, matched, time.perf_counter_ns() - start_time))
+            return matched
+
+        allowed = self._prefilter(machine, match)
+        if not allowed:
+            self.evaluations += 1
+            for rule, matched, time_ns in evaluated:
+                rule.stats.record(matched, time_ns)
+
+        return allowed
+
+    # Whether the given machine could match based only on the prefilter rules,
+    # using the given function to match each rule
+    def _prefilter(self, machine: Machine, match: Callable[[Rule], bool]) -> bool:
+        if any(rule.attribute.requires_metadata for rule in self.overrides):
+            # An override could still match once metadata is loaded, so only those
+            # rules that apply regardless of overrides can be used
+            return all(match(rule) for rule in self.prefilter_rules if rule.attribute.apply_to_overrides)
+
+        matched_by_override = any(match(rule) for rule in self.overrides)
+        return all((matched_by_override and not rule.attribute.apply_to_overrides) or match(rule) for rule in self.prefilter_rules)
+
     # Optimizes the ruleset processing by sorting the rules by expected performance characteristics
     def _optimize(self) -> None:
         for rules in [self.rules, self.overrides]:
             rules.sort(key=lambda r: len(r.exact_values))
             rules.sort(key=lambda r: len(r.pattern_values))
+
+        # Prefer what's been learned at runtime
+        if self.adaptive:
+            self.rules.sort(key=lambda r: r.stats.score)
+
+        # Track rules that can be evaluated before metadata has been loaded
+        self.prefilter_rules = [rule for rule in self.rules if not rule.attribute.requires_metadata]
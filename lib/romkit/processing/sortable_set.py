@@ -3,18 +3,33 @@ from __future__ import annotations
 from romkit.models.machine import Machine
 from romkit.processing.rule import Rule, RuleTransform
 from romkit.util.dict_utils import slice_only
+from romkit.util.trace import tracer
 
-import logging
 from collections import defaultdict
 from enum import Enum
 from functools import partial
-from typing import List
+from typing import Any, Callable, Dict, List
 
 class SortOrder(Enum):
     ASCENDING = 'ascending'
     DESCENDING = 'descending'
 
 
+# Wraps a sort key so that it's sorted in reverse order.  This is used for
+# values that can't be negated (e.g. strings) when building composite keys.
+class DescendingKey:
+    __slots__ = ['value']
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def __eq__(self, other: DescendingKey) -> bool:
+        return self.value == other.value
+
+    def __lt__(self, other: DescendingKey) -> bool:
+        return other.value < self.value
+
+
 # Represents a sortable collection of machines
 class SortableSet:
     # A set of keys that have been reserved for special use in configuring
@@ -37,6 +52,11 @@ class SortableSet:
         self.rules = []
         self.sort_keys = {}
 
+        # Composite sort key for each machine (see `sort_key`).  This is only
+        # populated while prioritizing.
+        self._machine_sort_keys: Dict[Machine, tuple] = {}
+        self._sort_key_fns = []
+
     # Builds a SortableSet from the given json data
     @classmethod
     def from_json(cls, json: dict, attributes: List[BaseAttribute], **kwargs) -> SortableSet:
@@ -88,6 +108,9 @@ class SortableSet:
             else:
                 sort_key = new_rule.first_match_index
 
+            if new_rule.invert:
+                sort_key = partial(self._descending_key, sort_key)
+
             self.sort_keys[new_rule] = sort_key
 
     # Clears the current list of groups being tracked
@@ -113,6 +136,15 @@ class SortableSet:
     # post-processing, such as restricting the list of machines to prevent
     # multiple with the same title
     def prioritize(self) -> List[Machine]:
+        self._sort_key_fns = [self.sort_keys[rule] for rule in self.rules]
+
+        try:
+            return self._prioritize()
+        finally:
+            self._machine_sort_keys.clear()
+
+    # Prioritizes machines based on the current sort keys (see `prioritize`)
+    def _prioritize(self) -> List[Machine]:
         if 'group' in self.group_by:
             machines = []
             groups = self.groups.copy()
@@ -172,27 +204,47 @@ class SortableSet:
                 for machine in group:
                     if machine.has_playlist and machine.playlist_name == top_machine.playlist_name:
                         groups_by_disc_title[machine.disc_title].append(machine)
-                    else:
-                        logging.debug(f'[{machine.name}] Skip (PriorityFilter)')
+                    elif tracer.enabled:
+                        tracer.machine(machine.name, 'Skip', 'PriorityFilter')
 
                 # Add only a single machine for each disc within the playlist
                 machines.extend(self._prioritize_groups(groups_by_disc_title, False))
             else:
                 # Add just the top machine
                 machines.append(top_machine)
-                for machine in group[1:]:
-                    logging.debug(f'[{machine.name}] Skip (PriorityFilter)')
+                if tracer.enabled:
+                    for machine in group[1:]:
+                        tracer.machine(machine.name, 'Skip', 'PriorityFilter')
 
         return machines
 
     # Sorts the list of machines based on the sorting rules in the order they
     # were defined
     def _sort(self, machines: List[Machine]) -> List[Machine]:
-        for rule in reversed(self.rules):
-            machines.sort(key=self.sort_keys[rule], reverse=rule.invert)
-
+        machines.sort(key=self.sort_key)
         return machines
 
+    # Generates a single key for sorting the machine that covers every rule, in
+    # the order they were defined.  Keys are computed once per machine while
+    # prioritizing, even if the machine is sorted multiple times (e.g. by group
+    # and then by disc title).
+    def sort_key(self, machine: Machine) -> tuple:
+        key = self._machine_sort_keys.get(machine)
+        if key is None:
+            key = tuple(sort_key_fn(machine) for sort_key_fn in self._sort_key_fns)
+            self._machine_sort_keys[machine] = key
+
+        return key
+
+    # Reverses the order of the value generated by the given sort key so that
+    # inverted rules can be included in a composite key
+    def _descending_key(self, sort_key: Callable, machine: Machine) -> Any:
+        value = sort_key(machine)
+        if isinstance(value, (int, float)):
+            return -value
+        else:
+            return DescendingKey(value)
+
     # Generates a function that coalesces machine values for the given rule to avoid
     # sorting issues when we have both null and non-null values.
     def _coalesce_machine_value_fn(self, rule: Rule) -> Callable:
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from romkit.resources.actions.base import BaseAction
 
-import lxml.etree
 import tempfile
 from contextlib import contextmanager
 from pathlib import Path
@@ -14,6 +13,8 @@ class FileToDat(BaseAction):
 
     @contextmanager
     def create_dat(self, target: ResourcePath) -> None:
+        import lxml.etree
+
         with tempfile.TemporaryDirectory() as tmpdir:
             # Write initially to a temporary file in case there's a failure part-way through
             tmp_target = Path(tmpdir).joinpath('out.xml')
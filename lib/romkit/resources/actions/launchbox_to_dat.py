@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from romkit.resources.actions.file_to_dat import FileToDat
 
-import lxml.etree
 import re
 from pathlib import PureWindowsPath
 
@@ -13,6 +12,8 @@ class LaunchBoxToDat(FileToDat):
 
     # Converts an LaunchBox XML file to a dat file readable by romkit
     def install(self, source: ResourcePath, target: ResourcePath, **kwargs) -> None:
+        import lxml.etree
+
         doc = lxml.etree.iterparse(str(source.path), tag=('Game'))
 
         if self.config.get('match'):
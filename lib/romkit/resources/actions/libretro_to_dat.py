@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from romkit.resources.actions.file_to_dat import FileToDat
 
-import lxml.etree
 import re
 from pathlib import Path
 
@@ -11,6 +10,8 @@ class LibretroToDat(FileToDat):
 
     # Converts an archive file listing to a dat file readable by romkit
     def install(self, source: ResourcePath, target: ResourcePath, **kwargs) -> None:
+        import lxml.etree
+
         lines = Path(source.path).read_text().split('\n')
 
         with self.create_dat(target) as file:
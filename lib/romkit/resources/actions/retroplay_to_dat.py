@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from romkit.resources.actions.file_to_dat import FileToDat
 
-import lxml.etree
 import re
 import tempfile
 from pathlib import Path
@@ -42,6 +41,8 @@ class RetroplayToDat(FileToDat):
     VERSION_PATTERN = re.compile(r'_v([0-9]+\.[0-9]+)')
 
     def install(self, source: ResourcePath, target: ResourcePath, **kwargs) -> None:
+        import lxml.etree
+
         doc = lxml.etree.iterparse(str(source.path), tag=('machine'))
         all_renames = self.config.get('renames', {})
         renames = {match_name: title for match_name, title in all_renames.items() if match_name[0] != '/'}
@@ -1,4 +1,17 @@
 from romkit.resources.adapters.base import BaseAdapter
 from romkit.resources.adapters.file import FileAdapter
-from romkit.resources.adapters.ftp import FTPAdapter
-from romkit.resources.adapters.http import HTTPAdapter
+
+import importlib
+
+# Adapters that depend on network stacks (e.g. requests / pycurl) are only
+# imported when they're first accessed
+__lazy_adapters__ = {
+    'FTPAdapter': 'romkit.resources.adapters.ftp',
+    'HTTPAdapter': 'romkit.resources.adapters.http',
+}
+
+def __getattr__(name: str):
+    if name in __lazy_adapters__:
+        return getattr(importlib.import_module(__lazy_adapters__[name]), name)
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,14 +1,40 @@
 from __future__ import annotations
 
+import importlib
 import logging
 import shutil
+import sys
 from pathlib import Path
+from typing import Type
 
 # Base class for defining adapters to handle downloading from different URI schemes
 class BaseAdapter:
+    # Modules for adapters that aren't imported until a URI scheme they handle
+    # is first used.  These depend on network stacks that are expensive to load.
+    LAZY_ADAPTER_MODULES = {
+        'ftp': 'romkit.resources.adapters.ftp',
+        'http': 'romkit.resources.adapters.http',
+        'https': 'romkit.resources.adapters.http',
+    }
+
     # List of URI schemes this adapter is capable of handling
     schemes = []
 
+    # Looks up the adapter that handles the given URI scheme, importing it if
+    # it hasn't been loaded yet
+    @classmethod
+    def for_scheme(cls, scheme: str) -> Type[BaseAdapter]:
+        for subcls in cls.__subclasses__():
+            if scheme in subcls.schemes:
+                return subcls
+
+        module_name = cls.LAZY_ADAPTER_MODULES.get(scheme)
+        if module_name and module_name not in sys.modules:
+            importlib.import_module(module_name)
+            return cls.for_scheme(scheme)
+
+        raise Exception(f'Invalid adapter scheme: {scheme}')
+
     # Whether to download files via this adapter even if the target file already exists
     def force(self, source: str, destination: Path) -> bool:
         return False
@@ -6,7 +6,6 @@ from romkit.resources.session import Session
 from romkit.util.dict_utils import deepmerge, slice_only
 
 import logging
-import requests
 import tempfile
 from pathlib import Path
 from urllib.parse import urlparse
@@ -26,13 +25,10 @@ class Downloader:
         self.session = session or Session()
         self.sites = sites
         self.middlewares = middlewares
-        self.adapters = {}
 
-        # Build default mapping of adapters for handling different URI schemes
-        for adapter in BaseAdapter.__subclasses__():
-            adapter_instance = adapter()
-            for scheme in adapter.schemes:
-                self.mount(scheme, adapter_instance)
+        # Mapping of adapters for handling different URI schemes.  Default adapters
+        # are only built the first time a scheme is used (see `adapter_for`).
+        self.adapters = {}
 
     @classmethod
     def instance(cls) -> Downloader:
@@ -60,15 +56,28 @@ class Downloader:
     def mount(self, scheme: str, adapter: BaseAdapter) -> None:
         self.adapters[scheme] = adapter
 
+    # Looks up the adapter for processing the given URI scheme, building the
+    # default adapter for it if one hasn't been mounted
+    def adapter_for(self, scheme: str) -> BaseAdapter:
+        adapter = self.adapters.get(scheme)
+        if adapter is None:
+            adapter_cls = BaseAdapter.for_scheme(scheme)
+            adapter = adapter_cls()
+            for adapter_scheme in adapter_cls.schemes:
+                self.adapters.setdefault(adapter_scheme, adapter)
+
+        return adapter
+
     # Attempts to download from the given source unless either:
     # * It already exists in the destination
     # * The file is being force-refreshed
     def get(self, source: str, destination: Path, force: bool = False) -> None:
         if not source:
+            import requests
             raise requests.exceptions.URLRequired()
 
         source_uri = urlparse(source)
-        adapter = self.adapters[source_uri.scheme]
+        adapter = self.adapter_for(source_uri.scheme)
 
         # Ensure directory exists
         destination.parent.mkdir(parents=True, exist_ok=True)
@@ -89,6 +98,7 @@ class Downloader:
                     download_path.rename(destination)
                 else:
                     download_path.unlink(missing_ok=True)
+                    import requests
                     raise requests.exceptions.HTTPError()
 
     # Looks up the given configuration, scoped to the given site
@@ -7,7 +7,7 @@ from romkit.resources.downloader import Downloader
 from romkit.resources.resource_path import ResourcePath
 
 from pathlib import Path
-from typing import Optional, Set
+from typing import Optional, Set, Union
 from urllib.parse import quote, unquote, urlparse
 
 class Resource:
@@ -130,9 +130,10 @@ class Resource:
             self.xref_path.path.parent.mkdir(parents=True, exist_ok=True)
             self.xref_path.symlink_to(self.target_path)
 
-    # Determines whether the given files are contained within the target resource path
-    def contains(self, files: Set[File]) -> bool:
-        return self.target_path.contains(files)
+    # Determines whether the given files (by their ids in the rom table) are
+    # contained within the target resource path
+    def contains(self, rom_ids: Set[Union[int, str, None]], rom_table: ROMTable) -> bool:
+        return self.target_path.contains(rom_ids, rom_table)
 
     # Runs any post-processing on the target file
     def clean(self, expected_files: Optional[Set[File]] = None) -> None:
@@ -188,7 +189,7 @@ class ResourceTemplate:
         # Path to store the downloaded source (before processing)
         download_path_template: Optional[str] = None,
         # Client to use for downloading
-        downloader: Downloader = Downloader.instance(),
+        downloader: Optional[Downloader] = None,
         # Action to run for postprocessing the downloaded source
         install_action: BaseAction = Copy(),
         # Whether usage of this resource is enabled
@@ -211,7 +212,7 @@ class ResourceTemplate:
         self.target_path_template = target_path_template
         self.xref_path_template = xref_path_template
         self.download_path_template = download_path_template
-        self.downloader = downloader
+        self.downloader = downloader or Downloader.instance()
         self.install_action = install_action
         self.enabled = enabled
         self.discovery = discovery
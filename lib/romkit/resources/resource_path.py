@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Set
+from typing import Set, Union
 
 import os
 
@@ -33,10 +33,10 @@ class ResourcePath:
     def build_file(self, name: str, size: int, crc: str) -> File:
         return self.resource.build_file(name, size, crc)
 
-    # Lists files installed in this path
-    def contains(self, files: Set[File]) -> bool:
+    # Whether the given files (by their ids in the rom table) are installed in this path
+    def contains(self, rom_ids: Set[Union[int, str, None]], rom_table: ROMTable) -> bool:
         if self.can_list_files:
-            return self.exists() and not any(files - self.list_files())
+            return self.exists() and rom_ids.issubset(rom_table.ids_of(self.list_files()))
         else:
             return self.exists()
 
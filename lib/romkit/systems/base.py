@@ -4,29 +4,54 @@ from romkit.attributes import __all_attributes__
 from romkit.models.collection_set import CollectionSet
 from romkit.models.machine import Machine
 from romkit.models.romset import ROMSet
-from romkit.processing import Metadata, Ruleset, RuleMatchReason, SortableSet
+from romkit.processing import EvaluationContext, Metadata, Ruleset, RuleMatchReason, SortableSet
 from romkit.resources.downloader import Downloader
 from romkit.systems.system_dir import SystemDir
 from romkit.util.dict_utils import deepmerge
+from romkit.util.trace import tracer
 
+import json
 import logging
 import os
-import requests
 import shlex
+import tempfile
 import traceback
 from collections import defaultdict
 from copy import copy
 from pathlib import Path
 from typing import Dict, Generator, List, Optional, Tuple
 
+# The system being loaded by a worker process.  This is inherited from the parent
+# process when the worker is forked rather than being serialized.
+_worker_system = None
+
+def _init_worker(system: BaseSystem) -> None:
+    global _worker_system
+    _worker_system = system
+
+# Loads / filters the romset at the given index in a worker process
+def _filter_romset_attrs(romset_index: int) -> List[Tuple[dict, Optional[RuleMatchReason]]]:
+    romset = _worker_system.romsets[romset_index]
+    romset.load()
+
+    with EvaluationContext.activate(f'{_worker_system.name}/{romset.name}'):
+        return _worker_system._filter_romset_attrs(romset)
+
+
 class BaseSystem:
     name = 'base'
 
+    # Number of patterns to include in rule profiles
+    TOP_PROFILED_PATTERNS = 10
+
     def __init__(self,
         name: str,
         stub: bool = False,
         rom_id_type: str = 'crc',
-        downloader: Downloader = Downloader.instance(),
+        romset_workers: int = 1,
+        filter_engine: str = 'machine',
+        adaptive_rule_order: bool = False,
+        downloader: Optional[Downloader] = None,
         favorites_rules: Ruleset = Ruleset(default_on_empty=None, log=False),
         collections: CollectionSet = CollectionSet(),
         filters: Ruleset = Ruleset(),
@@ -35,7 +60,10 @@ class BaseSystem:
         self.name = name
         self.stub = stub
         self.rom_id_type = rom_id_type
-        self.downloader = downloader
+        self.romset_workers = romset_workers
+        self.filter_engine = filter_engine
+        self.adaptive_rule_order = adaptive_rule_order
+        self.downloader = downloader or Downloader.instance()
         self.favorites_rules = favorites_rules
         self.collections = collections
         self.filters = filters
@@ -71,6 +99,12 @@ class BaseSystem:
             options['stub'] = json['roms']['stub']
         if 'id' in json['roms']:
             options['rom_id_type'] = json['roms']['id']
+        if 'romset_workers' in json['roms']:
+            options['romset_workers'] = json['roms']['romset_workers']
+        if 'filter_engine' in json['roms']:
+            options['filter_engine'] = json['roms']['filter_engine']
+        if 'adaptive_rule_order' in json['roms']:
+            options['adaptive_rule_order'] = json['roms']['adaptive_rule_order']
         if 'downloads' in json:
             options['downloader'] = Downloader.from_json(json['downloads'])
 
@@ -117,8 +151,95 @@ class BaseSystem:
             for attribute_name, attribute_config in json['attributes'].items():
                 system.reconfigure_attribute(attribute_name, attribute_config)
 
+        if system.adaptive_rule_order:
+            system.load_rule_stats()
+
         return system
 
+    # Path to the runtime stats learned for this system's filter rules.  Like the
+    # DAT cache, this is stored alongside the system's (first) DAT so that it
+    # persists between runs.
+    @property
+    def rule_stats_path(self) -> Path:
+        dat_romset = next((romset for romset in self.romsets if romset.dat), None)
+        if dat_romset:
+            dat_path = Path(dat_romset.dat.target_path.path)
+            return dat_path.with_name(f'{dat_path.name}.{self.name}-rule-stats.json')
+        else:
+            return Path(tempfile.gettempdir()).joinpath(f'romkit-{self.name}-rule-stats.json')
+
+    # Rulesets used for filtering machines, identified by name
+    @property
+    def filter_rulesets(self) -> Dict[str, Ruleset]:
+        rulesets = {'filters': self.filters}
+        for romset in self.romsets:
+            if romset.filters:
+                rulesets[f'romsets[{romset.name}].filters'] = romset.filters
+
+        return rulesets
+
+    # All rulesets, identified by name
+    @property
+    def rulesets(self) -> Dict[str, Ruleset]:
+        rulesets = {**self.filter_rulesets, 'favorites': self.favorites_rules}
+        for collection in self.collections.collections:
+            rulesets[f'collections[{collection.name}]'] = collection.rules
+        for system_dir in self.dirs:
+            rulesets[f'dirs[{system_dir.path}]'] = system_dir.rules
+
+        return rulesets
+
+    # Starts tracking runtime stats for the filter rules, starting with the order
+    # learned from previous runs (if any)
+    def load_rule_stats(self) -> None:
+        learned_stats = {}
+        if self.rule_stats_path.exists():
+            try:
+                with self.rule_stats_path.open() as file:
+                    learned_stats = json.load(file)
+            except (OSError, ValueError) as e:
+                logging.debug(f'Failed to read rule stats {self.rule_stats_path}: {e}')
+
+        for ruleset_name, ruleset in self.filter_rulesets.items():
+            ruleset.track_stats(learned_stats.get(ruleset_name, {}), adaptive=True)
+
+    # Persists the runtime stats for the filter rules so that the next run starts
+    # with the same order
+    def save_rule_stats(self) -> None:
+        learned_stats = {
+            ruleset_name: ruleset.dump_stats()
+            for ruleset_name, ruleset in self.filter_rulesets.items()
+        }
+
+        try:
+            with self.rule_stats_path.open('w') as file:
+                json.dump(learned_stats, file)
+        except OSError as e:
+            logging.debug(f'Failed to write rule stats {self.rule_stats_path}: {e}')
+
+    # Starts profiling every ruleset, tracking stats for each rule (including the
+    # time spent searching individual patterns)
+    def profile_rules(self) -> None:
+        for ruleset in self.rulesets.values():
+            ruleset.track_stats(adaptive=ruleset.adaptive, patterns=True)
+
+    # Summarizes the stats tracked for each ruleset along with the patterns that
+    # took the longest to search
+    def rule_profile(self) -> dict:
+        rulesets = {name: ruleset for name, ruleset in self.rulesets.items() if ruleset.tracking_stats}
+
+        patterns = []
+        for ruleset_name, ruleset in rulesets.items():
+            for rule in ruleset.overrides + ruleset.rules:
+                for pattern, time_ns in rule.stats.top_patterns():
+                    patterns.append({'ruleset': ruleset_name, 'rule': rule.id, 'pattern': pattern, 'time_ms': round(time_ns / 1e6, 3)})
+
+        return {
+            'system': self.name,
+            'rulesets': {name: ruleset.profile() for name, ruleset in rulesets.items()},
+            'top_patterns': sorted(patterns, key=lambda pattern: pattern['time_ms'], reverse=True)[:self.TOP_PROFILED_PATTERNS],
+        }
+
     # Sorts the prioritized machines list by name
     @property
     def sorted_prioritized_machines(self) -> List[Machine]:
@@ -144,31 +265,71 @@ class BaseSystem:
         self.machines.clear()
         self.prioritized_machines.clear()
 
-        # Filter and sort
-        for romset in self.romsets:
-            romset.load()
+        # Pick up any changes to the logging configuration
+        tracer.configure()
 
-            for machine, allow_reason in self._filter_romset(romset).items():
-                if allow_reason == RuleMatchReason.OVERRIDE:
-                    self.machines.override(machine)
-                else:
-                    self.machines.add(machine)
+        with EvaluationContext.activate(self.name):
+            # Filter and sort
+            for filtered_machines in self._filter_romsets():
+                for machine, allow_reason in filtered_machines.items():
+                    if allow_reason == RuleMatchReason.OVERRIDE:
+                        self.machines.override(machine)
+                    else:
+                        self.machines.add(machine)
 
-        # Cache prioritized list
-        self.prioritized_machines = self.machines.prioritize()
+            # Cache prioritized list
+            self.prioritized_machines = self.machines.prioritize()
 
-        # Update favorites / collections
-        for machine in self.prioritized_machines:
-            machine.favorite = self.favorites_rules.match(machine) is not None
-            machine.collections.update(self.collections.list(machine))
+            # Update favorites / collections.  Favorites are determined first since
+            # collections can be based on them.
+            favorites = Ruleset.memberships({'favorites': self.favorites_rules}, self.prioritized_machines, self.filter_engine)['favorites']
+            for machine in self.prioritized_machines:
+                machine.favorite = machine in favorites
+
+            machine_collections = self.collections.list_all(self.prioritized_machines, self.filter_engine)
+            for machine in self.prioritized_machines:
+                machine.collections = machine.collections.union(machine_collections.get(machine, set()))
+
+        self.metadata.log_stats(self.name)
+
+        if self.adaptive_rule_order:
+            self.save_rule_stats()
 
         self._loaded = True
         return True
 
+    # Loads and filters the machines in each romset (in order).  If multiple workers
+    # have been configured, romsets will be loaded in parallel across processes.
+    def _filter_romsets(self) -> Generator[None, Dict[Machine, RuleMatchReason], None]:
+        max_workers = min(self.romset_workers, len(self.romsets))
+
+        if max_workers > 1:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_init_worker,
+                initargs=(self,),
+            ) as executor:
+                romset_indexes = range(len(self.romsets))
+                for romset, filtered_machine_attrs in zip(self.romsets, executor.map(_filter_romset_attrs, romset_indexes)):
+                    yield romset.load_filtered_machine_attrs(filtered_machine_attrs, self.metadata)
+        else:
+            for romset in self.romsets:
+                romset.load()
+                yield self._filter_romset(romset)
+
     # Filters the machines in the given romset
     def _filter_romset(self, romset: ROMSet) -> Dict[Machine, RuleMatchReason]:
         return romset.filter_machines(self.filters, self.metadata)
 
+    # Filters the machines in the given romset, generating attributes that can be
+    # shared between processes
+    def _filter_romset_attrs(self, romset: ROMSet) -> List[Tuple[dict, Optional[RuleMatchReason]]]:
+        return romset.filter_machine_attrs(self.filters, self.metadata)
+
     # Generates the list of machines to target, based are predefined priorities
     def list(self) -> List[Machine]:
         self.load()
@@ -200,6 +361,8 @@ class BaseSystem:
     # 
     # A set of resources to install can be provided.
     def install_machine(self, machine: Machine, resource_names: Set[str] = None) -> bool:
+        import requests
+
         try:
             machine.install(resource_names)
             return True
@@ -215,18 +378,36 @@ class BaseSystem:
     # installed machines
     def organize(self) -> None:
         self.load()
-        self.reset_directories()
-
-        for machine in self.sorted_prioritized_machines:
-            if not self.stub and not machine.is_valid_nonmerged():
-                logging.warn(f'[{machine.name}] is not a valid non-merged ROM')
-                continue
 
-            # Enable machine in directories that are filtering for it
-            machine.clean()
-            for system_dir in self.dirs:
-                if system_dir.allow(machine):
-                    self.enable_machine(machine, system_dir)
+        # Capture what's currently installed before the directories get reset
+        self.attribute('filesystem').scan()
+        self.reset_directories()
+        tracer.configure()
+
+        with EvaluationContext.activate(self.name):
+            machines = self.sorted_prioritized_machines
+            if not self.stub:
+                invalid_machines = {machine for machine in machines if not machine.is_valid_nonmerged()}
+            else:
+                invalid_machines = set()
+
+            # Determine which directories are filtering for each machine
+            dir_machines = Ruleset.memberships(
+                {system_dir: system_dir.rules for system_dir in self.dirs},
+                [machine for machine in machines if machine not in invalid_machines],
+                self.filter_engine,
+            )
+
+            for machine in machines:
+                if machine in invalid_machines:
+                    logging.warn(f'[{machine.name}] is not a valid non-merged ROM')
+                    continue
+
+                # Enable machine in directories that are filtering for it
+                machine.clean()
+                for system_dir in self.dirs:
+                    if machine in dir_machines[system_dir]:
+                        self.enable_machine(machine, system_dir)
 
     # Reset the visible set of machines
     def reset_directories(self) -> None:
@@ -237,6 +418,14 @@ class BaseSystem:
     def enable_machine(self, machine: Machine, system_dir: SystemDir) -> None:
          machine.enable(system_dir)
 
+    # Logs the number of times machines were able to reuse previously built file
+    # sets (e.g. non-merged roms) instead of rebuilding them
+    def log_file_set_reuses(self) -> None:
+        for romset in self.romsets:
+            if romset.file_set_reuses:
+                reuses = ', '.join(f'{key}={count}' for key, count in sorted(romset.file_set_reuses.items()))
+                logging.debug(f'[{romset.name}] File sets reused: {reuses}')
+
     # Purges machines that were not installed
     def vacuum(self) -> None:
         # Identify all of the valid paths for machines that are installed
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+# Diagnostics for hot paths, such as why each machine was skipped.
+#
+# With large DATs, these events can happen hundreds of thousands of times per
+# run, so callers are expected to check `tracer.enabled` (a plain attribute)
+# before building any message.  When debug logging is disabled, that check is
+# the only cost.
+#
+# A sample rate can optionally be configured so that only a fraction of events
+# are traced (e.g. 0.01 traces every 100th event).  Sampling is deterministic so
+# that runs can be compared against each other.
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.sample_rate = 1.0
+        self._sample_credit = 0.0
+
+    # Updates the tracer based on the current logging configuration
+    def configure(self, sample_rate: Optional[float] = None) -> None:
+        if sample_rate is not None:
+            self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+
+        self.enabled = self.sample_rate > 0 and logging.getLogger().isEnabledFor(logging.DEBUG)
+        self._sample_credit = 0.0
+
+    # Traces an action taken on the machine with the given name and the reason for
+    # it (e.g. "Skip (flags)")
+    def machine(self, machine_name: str, action: str, reason: str) -> None:
+        if self.sample_rate < 1:
+            self._sample_credit += self.sample_rate
+            if self._sample_credit < 1:
+                return
+            self._sample_credit -= 1
+
+        logging.debug('[%s] %s (%s)', machine_name, action, reason)
+
+
+tracer = Tracer()